@@ -0,0 +1,80 @@
+"""
+Tokens per second of generate_batch against looping generate_text over the same prompts,
+with prompts of different lengths and an untrained MambaLM, greedy decoding
+
+    python benchmarks/batch_generation.py --prompts 32 --max-tokens 64
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import torch
+
+from mamba_py.utils.metaclasses      import Globals
+from mamba_py.tokenizer.tokenizer    import Tokenizer
+from mamba_py.model.config           import MambaConfig
+from mamba_py.model.mamba            import MambaLM
+from mamba_py.trainer.generate_model import GenerateModel
+
+from bpe_train import synthetic_corpus
+
+
+def measure(name, generate, num_tokens):
+    time_start = time.perf_counter()
+    texts = generate()
+    time_total = time.perf_counter() - time_start
+
+    print(f"{name:<24} {time_total:>10.2f}s {num_tokens / time_total:>12.0f}")
+    return texts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--vocab', type=int, default=512)
+    parser.add_argument('--d-model', type=int, default=256)
+    parser.add_argument('--n-layer', type=int, default=4)
+    parser.add_argument('--prompts', type=int, default=32)
+    parser.add_argument('--max-tokens', type=int, default=64)
+    parser.add_argument('--batch-size', type=int, default=64)
+    args = parser.parse_args()
+
+    Globals.wandb_log_run = False
+
+    text = synthetic_corpus(200_000)
+    tokenizer = Tokenizer()
+    tokenizer.train(text, args.vocab)
+
+    # Prompts of 4 to 64 tokens cut from the corpus
+    rng = random.Random(0)
+    input_ids = tokenizer.encode(text[:20_000])
+    prompts = []
+
+    for _ in range(args.prompts):
+        start, length = rng.randrange(len(input_ids) - 64), rng.randint(4, 64)
+        prompts.append(tokenizer.decode(input_ids[start:start + length]))
+
+    torch.manual_seed(0)
+    config = {"vocab_size": len(tokenizer.vocab), "d_model": args.d_model, "n_layer": args.n_layer}
+    model, _ = GenerateModel(config, MambaLM, MambaConfig)
+    model.eval()
+
+    # Without stop strings every prompt generates max_tokens tokens
+    num_tokens = args.prompts * args.max_tokens
+
+    print(f"{args.prompts} prompts, {args.max_tokens} tokens each\n")
+    print(f"{'mode':<24} {'time':>11} {'tokens/s':>12}")
+
+    loop = measure("generate_text loop", lambda: [model.generate_text(tokenizer, prompt, args.max_tokens) for prompt in prompts], num_tokens)
+    batch = measure("generate_batch", lambda: model.generate_batch(tokenizer, prompts, args.max_tokens, batch_size=args.batch_size), num_tokens)
+
+    # generate_text returns the prompt with the generated text
+    print(f"\nsame text: {loop == [tokenizer.decode(tokenizer.encode(prompt)) + text for prompt, text in zip(prompts, batch)]}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Compares time and peak memory of Tokenizer.train against the unique-chunk trainer
+
+    python benchmarks/bpe_train.py --size 2000000 --vocab 2048
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from mamba_py.tokenizer.tokenizer import Tokenizer
+
+
+def synthetic_corpus(size, seed=0):
+    rng = random.Random(seed)
+    letters = 'etaoinshrdlcumwfgypbvkjxqz'
+
+    words = [''.join(rng.choice(letters) for _ in range(rng.randint(1, 10))) for _ in range(5000)]
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+
+    pieces = []
+    length = 0
+
+    while length < size:
+        sentence = ' '.join(rng.choices(words, weights, k=12)) + '.\n'
+        pieces.append(sentence)
+        length += len(sentence)
+
+    return ''.join(pieces)[:size]
+
+
+def measure(name, train):
+    tracemalloc.start()
+    time_start = time.perf_counter()
+
+    tokenizer = train()
+
+    time_train = time.perf_counter() - time_start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{name:<24} {time_train:>10.2f}s {peak / 2**20:>12.1f} MiB {len(tokenizer.vocab):>8} tokens")
+    return tokenizer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=2_000_000)
+    parser.add_argument('--vocab', type=int, default=2048)
+    parser.add_argument('--sample', type=int, default=100_000)
+    args = parser.parse_args()
+
+    text = synthetic_corpus(args.size)
+    print(f"corpus: {len(text)} characters, target vocab: {args.vocab}\n")
+    print(f"{'trainer':<24} {'time':>11} {'peak memory':>16} {'vocab':>15}")
+
+    def train_sequence():
+        tokenizer = Tokenizer()
+        tokenizer.train(text, args.vocab)
+        return tokenizer
+
+    def train_chunks():
+        tokenizer = Tokenizer()
+        tokenizer.train_chunks(text, args.vocab)
+        return tokenizer
+
+    def train_sample():
+        tokenizer = Tokenizer()
+        tokenizer.train_chunks(text, args.vocab, sample_size=args.sample, seed=0)
+        return tokenizer
+
+    sequence = measure("train", train_sequence)
+    chunks   = measure("train_chunks", train_chunks)
+    sample   = measure("train_chunks (sample)", train_sample)
+
+    print()
+    for name, tokenizer in (("train", sequence), ("train_chunks", chunks), ("train_chunks (sample)", sample)):
+        print(f"{name:<24} encodes the corpus into {len(tokenizer.encode(text))} tokens")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Scaling of data-parallel CPU training over gloo with 1, 2, 4 and 8 processes.
+Every rank trains on --batch-size sequences per step, so the global batch grows with the processes
+
+    python benchmarks/data_parallel.py --processes 1 2 4 8
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import torch
+import numpy as np
+
+from mamba_py.utils.metaclasses    import Globals
+from mamba_py.utils.distributed    import Distributed
+from mamba_py.trainer.batch_loader import BatchLoader
+
+from train_modes import TinyLM
+
+
+def run(args, result_file):
+    Globals.wandb_log_run = False
+    Globals.infer_during_training = False
+
+    from mamba_py.trainer.train_model import TrainModel
+
+    world_size = Distributed.WorldSize()
+    num_tokens = args.steps * args.batch_size * args.seq_length * world_size
+
+    input_ids = np.random.default_rng(0).integers(0, args.vocab, num_tokens)
+    batches = BatchLoader(input_ids, args.seq_length, args.batch_size, device=torch.device("cpu"))
+
+    torch.manual_seed(0)
+    model = TinyLM(args.vocab, args.d_model, args.n_layer)
+
+    Distributed.Barrier()
+    time_start = time.perf_counter()
+    TrainModel(model, batches, 1, 1e-4)
+    Distributed.Barrier()
+    time_total = time.perf_counter() - time_start
+
+    if Distributed.IsMain():
+        with open(result_file, 'w') as f:
+            f.write(f"{num_tokens / time_total}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--vocab', type=int, default=4096)
+    parser.add_argument('--d-model', type=int, default=128)
+    parser.add_argument('--n-layer', type=int, default=2)
+    parser.add_argument('--seq-length', type=int, default=256)
+    parser.add_argument('--batch-size', type=int, default=4)
+    parser.add_argument('--steps', type=int, default=20)
+    args = parser.parse_args()
+
+    result_file = f"data_parallel_{os.getpid()}.txt"
+    baseline = None
+
+    print(f"{os.cpu_count()} cores")
+    print(f"{'processes':>9} {'tokens/s':>10} {'speedup':>8} {'efficiency':>10}")
+
+    for num_processes in args.processes:
+        Distributed.Spawn(run, num_processes, args, result_file, port=29500 + num_processes)
+
+        with open(result_file) as f:
+            throughput = float(f.read())
+
+        baseline = baseline or throughput
+        speedup = throughput / baseline
+
+        print(f"{num_processes:>9} {throughput:>10.0f} {speedup:>7.2f}x {speedup / num_processes * args.processes[0]:>9.0%}")
+
+    os.remove(result_file)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Compares throughput and peak RSS of the list-based GenerateData pipeline against the NumPy one.
+Each pipeline runs in its own process on the same synthetic corpus
+
+    python benchmarks/data_pipeline.py --size-mb 1024
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import resource
+import multiprocessing as mp
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import torch
+import numpy as np
+
+from mamba_py.utils.util            import Util
+from mamba_py.tokenizer.tokenizer   import Tokenizer
+from mamba_py.trainer.generate_data import GenerateData
+
+
+def synthetic_texts(size, seed=0):
+    rng = random.Random(seed)
+    letters = 'etaoinshrdlcumwfgypbvkjxqz'
+
+    words = [''.join(rng.choice(letters) for _ in range(rng.randint(1, 10))) for _ in range(5000)]
+    texts = []
+    length = 0
+
+    while length < size:
+        text = ' '.join(rng.choices(words, k=200)) + '.\n'
+        texts.append(text)
+        length += len(text)
+
+    return texts
+
+
+def list_pipeline(texts, tokenizer, seq_length, batch_size):
+    vocab_size = len(tokenizer.vocab)
+
+    text = ''.join([elem for sublist in texts for elem in sublist])
+    input_ids = tokenizer.encode(text)
+    input_ids = [min(token, vocab_size) for token in input_ids]
+
+    input_ids = np.array(input_ids)
+    num_batches = len(input_ids) // (seq_length * batch_size)
+    array_reshaped = input_ids[:num_batches * seq_length * batch_size].reshape((num_batches, batch_size, seq_length))
+
+    batches = [torch.tensor(batch, dtype=torch.long).to(Util.GetDevice()) for batch in array_reshaped]
+    return num_batches * seq_length * batch_size
+
+
+def numpy_pipeline(texts, tokenizer, seq_length, batch_size):
+    dataset = {"train": {"text": texts}}
+
+    input_ids = GenerateData.LoadTokens(dataset, tokenizer, len(tokenizer.vocab))
+    batches, num_batches = GenerateData.BatchSequences(input_ids, seq_length, batch_size)
+
+    for batch in batches:
+        pass
+
+    return num_batches * seq_length * batch_size
+
+
+def run(name, size, tokenizer_file, seq_length, batch_size, results):
+    texts = synthetic_texts(size)
+    tokenizer = Tokenizer()
+    tokenizer.from_file(tokenizer_file)
+
+    pipeline = list_pipeline if name == "list" else numpy_pipeline
+
+    time_start = time.perf_counter()
+    num_tokens = pipeline(texts, tokenizer, seq_length, batch_size)
+    time_total = time.perf_counter() - time_start
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    results.put((name, time_total, num_tokens, peak_rss))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size-mb', type=float, default=1024)
+    parser.add_argument('--vocab', type=int, default=1024)
+    parser.add_argument('--seq-length', type=int, default=1024)
+    parser.add_argument('--batch-size', type=int, default=4)
+    args = parser.parse_args()
+
+    size = int(args.size_mb * 2**20)
+    tokenizer_file = "bench_tokenizer.bin"
+
+    tokenizer = Tokenizer()
+    tokenizer.train_chunks(synthetic_texts(min(size, 2**20), seed=1), args.vocab)
+    tokenizer.to_file(tokenizer_file)
+
+    print(f"corpus: {size / 2**20:.0f} MiB, vocab: {args.vocab}\n")
+    print(f"{'pipeline':<10} {'time':>10} {'MB/s':>10} {'Mtokens/s':>10} {'peak RSS':>12}")
+
+    results = mp.Queue()
+
+    for name in ("list", "numpy"):
+        process = mp.Process(target=run, args=(name, size, tokenizer_file, args.seq_length, args.batch_size, results))
+        process.start()
+        process.join()
+
+        if process.exitcode != 0:
+            print(f"{name:<10} failed with exit code {process.exitcode} (out of memory?)")
+            continue
+
+        name, time_total, num_tokens, peak_rss = results.get()
+        print(f"{name:<10} {time_total:>9.1f}s {size / 2**20 / time_total:>10.2f} {num_tokens / 1e6 / time_total:>10.2f} {peak_rss / 2**20:>8.0f} MiB")
+
+    os.remove(tokenizer_file)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Compares the per-step cost of logging a loss with .item() and Util.Tee against Metrics.Log.
+On the CPU .item() does not wait for anything, the difference shows with a CUDA device
+
+    python benchmarks/metrics_overhead.py
+"""
+
+import os
+import sys
+import time
+import tempfile
+import torch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from mamba_py.utils.util    import Util
+from mamba_py.utils.metrics import Metrics
+
+
+def log_direct(step, loss, log_file, log_every):
+    loss = loss.item()
+
+    if step % log_every == 0:
+        Util.Tee(log_file, f"Step: {step}\t\tLoss: {round(loss, 4)}")
+
+
+def bench(fn, losses):
+    time_start = time.perf_counter()
+
+    for step, loss in enumerate(losses):
+        fn(step, loss)
+
+    return time.perf_counter() - time_start
+
+
+def main(num_steps=20000, log_every=1000):
+    device = Util.GetDevice()
+    losses = [torch.rand((), device=device) for _ in range(num_steps)]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        log_file = os.path.join(tmp_dir, "training_log.txt")
+        time_direct = bench(lambda step, loss: log_direct(step, loss, log_file, log_every), losses)
+
+        metrics = Metrics(os.path.join(tmp_dir, "metrics.jsonl"))
+
+        def log_metrics(step, loss):
+            if step % log_every == 0:
+                metrics.Log({"step": step, "loss": loss}, log_file, f"Step: {step}\t\tLoss: {{loss:.4f}}")
+            else:
+                metrics.Log({"step": step, "loss": loss})
+
+        time_metrics = bench(log_metrics, losses)
+
+        time_start = time.perf_counter()
+        metrics.Close()
+        time_close = time.perf_counter() - time_start
+
+    print(f"{'path':>10}  {'us/step':>10}")
+    print(f"{'direct':>10}  {time_direct / num_steps * 1e6:>10.2f}")
+    print(f"{'metrics':>10}  {time_metrics / num_steps * 1e6:>10.2f}  (+{time_close * 1e3:.0f} ms draining the writer on close)")
+
+
+if __name__ == '__main__':
+    main()
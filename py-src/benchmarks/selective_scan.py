@@ -0,0 +1,74 @@
+"""
+Compares the chunked parallel selective scan of MambaLM against the sequential reference scan,
+forward and backward, on the CPU
+
+    python benchmarks/selective_scan.py --d-inner 512 --lengths 128 512 2048
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import torch
+
+from mamba_py.model.selective_scan import selective_scan, selective_scan_sequential
+
+
+def make_inputs(batch, length, d_inner, d_state):
+    x  = torch.randn(batch, length, d_inner, requires_grad=True)
+    dt = torch.nn.functional.softplus(torch.randn(batch, length, d_inner) - 4).requires_grad_()
+    A  = -torch.arange(1, d_state + 1, dtype=torch.float32).repeat(d_inner, 1)
+    B  = torch.randn(batch, length, d_state, requires_grad=True)
+    C  = torch.randn(batch, length, d_state, requires_grad=True)
+    D  = torch.ones(d_inner)
+
+    return x, dt, A, B, C, D
+
+
+def bench(fn, inputs, repeats):
+    time_start = time.perf_counter()
+
+    for _ in range(repeats):
+        y, state = fn(*inputs)
+        y.sum().backward()
+
+    return (time.perf_counter() - time_start) / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batch', type=int, default=4)
+    parser.add_argument('--d-inner', type=int, default=256)
+    parser.add_argument('--d-state', type=int, default=16)
+    parser.add_argument('--lengths', type=int, nargs='+', default=[64, 256, 1024])
+    parser.add_argument('--chunk-sizes', type=int, nargs='+', default=[16, 64, 256])
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+
+    print(f"{'length':>7} {'scan':>12} {'ms/iter':>10} {'speedup':>8} {'max diff':>10}")
+
+    for length in args.lengths:
+        inputs = make_inputs(args.batch, length, args.d_inner, args.d_state)
+
+        y_ref, _ = selective_scan_sequential(*inputs)
+        time_ref = bench(selective_scan_sequential, inputs, args.repeats)
+
+        print(f"{length:>7} {'sequential':>12} {time_ref * 1e3:>10.1f} {1:>7.2f}x")
+
+        for chunk_size in args.chunk_sizes:
+            fn = lambda *inputs: selective_scan(*inputs, chunk_size=chunk_size)
+
+            y, _ = fn(*inputs)
+            diff = (y - y_ref).abs().max().item()
+            time_chunked = bench(fn, inputs, args.repeats)
+
+            print(f"{length:>7} {f'chunk {chunk_size}':>12} {time_chunked * 1e3:>10.1f} {time_ref / time_chunked:>7.2f}x {diff:>10.2e}")
+
+
+if __name__ == '__main__':
+    main()
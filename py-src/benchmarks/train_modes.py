@@ -0,0 +1,103 @@
+"""
+Throughput and peak memory of TrainModel with gradient accumulation and bf16 autocast.
+Every mode trains on the same tokens per optimizer step, in its own process
+
+    python benchmarks/train_modes.py --batch-size 8 --seq-length 512
+"""
+
+import os
+import sys
+import time
+import argparse
+import resource
+import multiprocessing as mp
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import torch
+import numpy as np
+
+from mamba_py.utils.metaclasses    import Globals
+from mamba_py.utils.util           import Util
+from mamba_py.trainer.batch_loader import BatchLoader
+
+
+class TinyLM(torch.nn.Module):
+    def __init__(self, vocab_size, d_model, n_layer):
+        super().__init__()
+
+        self.embedding = torch.nn.Embedding(vocab_size, d_model)
+        self.layers = torch.nn.ModuleList([torch.nn.Sequential(torch.nn.LayerNorm(d_model), torch.nn.Linear(d_model, 4 * d_model), torch.nn.GELU(), torch.nn.Linear(4 * d_model, d_model)) for _ in range(n_layer)])
+        self.lm_head = torch.nn.Linear(d_model, vocab_size, bias=False)
+
+    def compute_loss(self, input_ids):
+        hidden_states = self.embedding(input_ids[:, :-1])
+
+        for layer in self.layers:
+            hidden_states = hidden_states + layer(hidden_states)
+
+        logits = self.lm_head(hidden_states).float()
+        return torch.nn.functional.cross_entropy(logits.flatten(0, 1), input_ids[:, 1:].flatten())
+
+
+def run(name, accumulation_steps, bf16, args, results):
+    Globals.wandb_log_run = False
+    Globals.infer_during_training = False
+
+    from mamba_py.trainer.train_model import TrainModel
+
+    micro_batch_size = args.batch_size // accumulation_steps
+    num_tokens = args.steps * args.batch_size * args.seq_length
+
+    input_ids = np.random.default_rng(0).integers(0, args.vocab, num_tokens)
+    batches = BatchLoader(input_ids, args.seq_length, micro_batch_size)
+
+    torch.manual_seed(0)
+    model = TinyLM(args.vocab, args.d_model, args.n_layer).to(Util.GetDevice())
+
+    time_start = time.perf_counter()
+    TrainModel(model, batches, 1, 1e-4, accumulation_steps=accumulation_steps, bf16=bf16)
+    time_total = time.perf_counter() - time_start
+
+    if torch.cuda.is_available():
+        peak = torch.cuda.max_memory_allocated()
+    else:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    results.put((name, num_tokens / time_total, peak))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--vocab', type=int, default=8192)
+    parser.add_argument('--d-model', type=int, default=256)
+    parser.add_argument('--n-layer', type=int, default=4)
+    parser.add_argument('--seq-length', type=int, default=512)
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--accumulation', type=int, default=4)
+    parser.add_argument('--steps', type=int, default=10)
+    args = parser.parse_args()
+
+    modes = [
+        ("fp32", 1, False),
+        (f"fp32 x{args.accumulation}", args.accumulation, False),
+        ("bf16", 1, True),
+        (f"bf16 x{args.accumulation}", args.accumulation, True),
+    ]
+
+    memory = "peak CUDA memory" if torch.cuda.is_available() else "peak RSS"
+    print(f"{'mode':<12} {'tokens/s':>10} {memory:>18}")
+
+    results = mp.Queue()
+
+    for name, accumulation_steps, bf16 in modes:
+        process = mp.Process(target=run, args=(name, accumulation_steps, bf16, args, results))
+        process.start()
+        process.join()
+
+        name, throughput, peak = results.get()
+        print(f"{name:<12} {throughput:>10.0f} {peak / 2**20:>14.0f} MiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Compares the linear Vocab.find scan against the (prev, byte) hash index
+
+    python benchmarks/vocab_find.py
+"""
+
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from mamba_py.tokenizer.token     import Token
+from mamba_py.tokenizer.tokenizer import Tokenizer
+
+
+def find_linear(tokens, byte, prev):
+    for i in range(len(tokens)):
+        token = tokens[i]
+
+        if byte == token.byte and prev == token.prev:
+            return i
+
+    return 0
+
+
+def build_tokenizer(vocab_size, rng):
+    tokenizer = Tokenizer()
+
+    while len(tokenizer.vocab) < vocab_size:
+        prev = rng.randrange(1, len(tokenizer.vocab))
+        byte = chr(rng.randrange(32, 127))
+
+        if tokenizer.vocab.find(byte, prev) == 0:
+            tokenizer.vocab += Token(byte, prev)
+
+    return tokenizer
+
+
+def bench(fn, queries):
+    time_start = time.perf_counter()
+
+    for byte, prev in queries:
+        fn(byte, prev)
+
+    return time.perf_counter() - time_start
+
+
+def main(vocab_sizes=(256, 1024, 4096, 16384, 32768), num_queries=2000):
+    rng = random.Random(0)
+
+    print(f"{'vocab_size':>10}  {'linear (us/find)':>18}  {'indexed (us/find)':>18}  {'speedup':>8}")
+
+    for vocab_size in vocab_sizes:
+        tokenizer = build_tokenizer(vocab_size, rng)
+        vocab = tokenizer.vocab
+        tokens = list(vocab)
+
+        queries = []
+        for _ in range(num_queries):
+            token = vocab[rng.randrange(len(vocab))]
+            queries.append((token.byte, token.prev))
+
+        time_linear  = bench(lambda byte, prev: find_linear(tokens, byte, prev), queries)
+        time_indexed = bench(vocab.find, queries)
+
+        for byte, prev in queries:
+            assert find_linear(tokens, byte, prev) == vocab.find(byte, prev)
+
+        print(f"{vocab_size:>10}  {time_linear / num_queries * 1e6:>18.2f}  {time_indexed / num_queries * 1e6:>18.3f}  {time_linear / time_indexed:>7.0f}x")
+
+
+if __name__ == '__main__':
+    main()
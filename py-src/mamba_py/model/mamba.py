@@ -0,0 +1,241 @@
+import os
+import json
+import math
+import torch
+import torch.nn.functional as F
+
+from collections import namedtuple
+from dataclasses import asdict
+
+from mamba_py.model.config         import MambaConfig
+from mamba_py.model.selective_scan import selective_scan
+
+
+CausalLMOutput = namedtuple("CausalLMOutput", ["logits", "states"])
+
+
+class RMSNorm(torch.nn.Module):
+    def __init__(self, d_model, eps=1e-5):
+        super().__init__()
+
+        self.eps = eps
+        self.weight = torch.nn.Parameter(torch.ones(d_model))
+
+    def forward(self, hidden_states):
+        dtype = hidden_states.dtype
+        hidden_states = hidden_states.float()
+        hidden_states = hidden_states * torch.rsqrt(hidden_states.pow(2).mean(-1, keepdim=True) + self.eps)
+
+        return (hidden_states * self.weight.float()).to(dtype)
+
+
+class MambaMixer(torch.nn.Module):
+    """
+    Selective SSM block, with the parameters of mamba_ssm's Mamba and of the C engine (mamba.h).
+
+    The state of a sequence is (conv_state, ssm_state): the last d_conv - 1 inputs of the
+    convolution and the SSM state. Passing the state of a previous call continues that sequence.
+    """
+
+    def __init__(self, d_model, d_state=16, d_conv=4, expand=2, dt_rank="auto", dt_min=0.001, dt_max=0.1, dt_init_floor=1e-4, scan_chunk_size=64):
+        super().__init__()
+
+        self.d_model    = d_model
+        self.d_state    = d_state
+        self.d_conv     = d_conv
+        self.d_inner    = expand * d_model
+        self.dt_rank    = math.ceil(d_model / 16) if dt_rank == "auto" else dt_rank
+        self.chunk_size = scan_chunk_size
+
+        self.in_proj  = torch.nn.Linear(d_model, 2 * self.d_inner, bias=False)
+        self.conv1d   = torch.nn.Conv1d(self.d_inner, self.d_inner, kernel_size=d_conv, groups=self.d_inner, padding=d_conv - 1, bias=True)
+        self.x_proj   = torch.nn.Linear(self.d_inner, self.dt_rank + 2 * d_state, bias=False)
+        self.dt_proj  = torch.nn.Linear(self.dt_rank, self.d_inner, bias=True)
+        self.out_proj = torch.nn.Linear(self.d_inner, d_model, bias=False)
+
+        # Same initialization as mamba_ssm, dt starts log-uniform in [dt_min, dt_max]
+        dt_init_std = self.dt_rank ** -0.5
+        torch.nn.init.uniform_(self.dt_proj.weight, -dt_init_std, dt_init_std)
+
+        dt = torch.exp(torch.rand(self.d_inner) * (math.log(dt_max) - math.log(dt_min)) + math.log(dt_min)).clamp(min=dt_init_floor)
+        with torch.no_grad():
+            self.dt_proj.bias.copy_(dt + torch.log(-torch.expm1(-dt)))
+
+        A = torch.arange(1, d_state + 1, dtype=torch.float32).repeat(self.d_inner, 1)
+        self.A_log = torch.nn.Parameter(torch.log(A))
+        self.D = torch.nn.Parameter(torch.ones(self.d_inner))
+
+
+    def forward(self, hidden_states, state=None):
+        batch = hidden_states.size(0)
+
+        x, z = self.in_proj(hidden_states).chunk(2, dim=-1)
+
+        # Causal depthwise convolution, over the inputs kept from the previous call or zeros
+        x = x.transpose(1, 2)
+        conv_state = state[0] if state is not None else x.new_zeros(batch, self.d_inner, self.d_conv - 1)
+
+        x = torch.cat([conv_state.to(x.dtype), x], dim=-1)
+        conv_state = x[:, :, x.size(-1) - (self.d_conv - 1):]
+
+        x = F.conv1d(x, self.conv1d.weight, self.conv1d.bias, groups=self.d_inner)
+        x = F.silu(x).transpose(1, 2)
+
+        dt, B, C = torch.split(self.x_proj(x), [self.dt_rank, self.d_state, self.d_state], dim=-1)
+        dt = F.softplus(self.dt_proj(dt))
+        A = -torch.exp(self.A_log.float())
+
+        y, ssm_state = selective_scan(x, dt, A, B, C, self.D, state[1] if state is not None else None, self.chunk_size)
+        y = y * F.silu(z)
+
+        return self.out_proj(y), (conv_state, ssm_state)
+
+
+class LayerNorm(torch.nn.LayerNorm):
+    """ computed in fp32 as RMSNorm, so an fp32 residual stream goes through bf16 weights """
+
+    def forward(self, hidden_states):
+        dtype = hidden_states.dtype
+        hidden_states = F.layer_norm(hidden_states.float(), self.normalized_shape, self.weight.float(), self.bias.float(), self.eps)
+
+        return hidden_states.to(dtype)
+
+
+def make_norm(config):
+    """ RMSNorm or LayerNorm, as mamba_ssm picks with rms_norm """
+    return RMSNorm(config.d_model) if config.rms_norm is True else LayerNorm(config.d_model, eps=1e-5)
+
+
+class Block(torch.nn.Module):
+    def __init__(self, config, **mixer_kwargs):
+        super().__init__()
+
+        self.residual_in_fp32 = config.residual_in_fp32
+
+        self.mixer = MambaMixer(config.d_model, **mixer_kwargs)
+        self.norm = make_norm(config)
+
+    def forward(self, hidden_states, state=None):
+        # The mixer runs in the dtype of the weights, the residual stream may stay in fp32 across the layers
+        output, state = self.mixer(self.norm(hidden_states).to(self.norm.weight.dtype), state)
+        residual = hidden_states.float() if self.residual_in_fp32 is True else hidden_states
+
+        return residual + output, state
+
+
+class MambaBackbone(torch.nn.Module):
+    def __init__(self, config, vocab_size):
+        super().__init__()
+
+        mixer_kwargs = {**config.ssm_cfg, "scan_chunk_size": config.scan_chunk_size}
+
+        self.embedding = torch.nn.Embedding(vocab_size, config.d_model)
+        self.layers = torch.nn.ModuleList([Block(config, **mixer_kwargs) for _ in range(config.n_layer)])
+        self.norm_f = make_norm(config)
+
+    def forward(self, input_ids, states=None, return_states=False):
+        hidden_states = self.embedding(input_ids)
+        new_states = []
+
+        for i, layer in enumerate(self.layers):
+            hidden_states, state = layer(hidden_states, states[i] if states is not None else None)
+            new_states.append(state)
+
+        hidden_states = self.norm_f(hidden_states).to(self.norm_f.weight.dtype)
+
+        return (hidden_states, new_states) if return_states is True else hidden_states
+
+
+class MambaLM(torch.nn.Module):
+    """
+    Pure PyTorch Mamba language model, which runs without the CUDA kernels of mamba_ssm.
+
+    Parameter names are those of MambaLMHeadModel (backbone.embedding, backbone.layers.N.mixer.*,
+    backbone.layers.N.norm, backbone.norm_f, lm_head), so its checkpoints export with export_model
+    and load into either model. It can be used as the model_class of GenerateModel with MambaConfig.
+
+    rms_norm and residual_in_fp32 are honored as in mamba_ssm. fused_add_norm only selects a fused
+    kernel there, with the same result, so it has no effect here.
+    """
+
+    def __init__(self, config):
+        super().__init__()
+
+        self.config = config
+
+        vocab_size = config.vocab_size
+        if vocab_size % config.pad_vocab_size_multiple != 0:
+            vocab_size += config.pad_vocab_size_multiple - vocab_size % config.pad_vocab_size_multiple
+
+        self.backbone = MambaBackbone(config, vocab_size)
+        self.lm_head = torch.nn.Linear(config.d_model, vocab_size, bias=False)
+
+        self.apply(self._init_weights)
+
+        if config.tie_embeddings is True:
+            self.lm_head.weight = self.backbone.embedding.weight
+
+
+    def _init_weights(self, module):
+        if isinstance(module, torch.nn.Embedding):
+            torch.nn.init.normal_(module.weight, std=0.02)
+
+        # Rescale the projections into the residual stream by the number of layers, as in mamba_ssm
+        if isinstance(module, MambaMixer):
+            with torch.no_grad():
+                module.out_proj.weight /= math.sqrt(self.config.n_layer)
+
+
+    def forward(self, input_ids, states=None, return_states=False):
+        hidden_states, states = self.backbone(input_ids, states, return_states=True)
+        logits = self.lm_head(hidden_states)
+
+        return CausalLMOutput(logits=logits, states=states if return_states is True else None)
+
+
+    @torch.no_grad()
+    def generate(self, input_ids, max_length, top_k=1, temperature=1.0):
+        """ prefills the prompt, then decodes one token at a time from the recurrent state """
+        output = self(input_ids, return_states=True)
+        logits, states = output.logits[:, -1], output.states
+        sequences = [input_ids]
+
+        for _ in range(max_length - input_ids.size(1)):
+            logits = logits[:, :self.config.vocab_size].float() / max(temperature, 1e-5)
+
+            if top_k == 1:
+                next_ids = logits.argmax(dim=-1, keepdim=True)
+            else:
+                if top_k > 0:
+                    threshold = torch.topk(logits, min(top_k, logits.size(-1))).values[:, -1:]
+                    logits = logits.masked_fill(logits < threshold, float("-inf"))
+
+                next_ids = torch.multinomial(torch.softmax(logits, dim=-1), 1)
+
+            sequences.append(next_ids)
+
+            output = self(next_ids, states, return_states=True)
+            logits, states = output.logits[:, -1], output.states
+
+        return torch.cat(sequences, dim=1)
+
+
+    def save_pretrained(self, save_directory):
+        """ same files as mamba_ssm's save_pretrained """
+        os.makedirs(save_directory, exist_ok=True)
+
+        torch.save(self.state_dict(), os.path.join(save_directory, "pytorch_model.bin"))
+
+        with open(os.path.join(save_directory, "config.json"), 'w') as f:
+            json.dump(asdict(self.config), f, indent=4)
+
+
+    @classmethod
+    def from_pretrained(cls, directory, device=None):
+        with open(os.path.join(directory, "config.json")) as f:
+            config = MambaConfig(**json.load(f))
+
+        model = cls(config)
+        model.load_state_dict(torch.load(os.path.join(directory, "pytorch_model.bin"), map_location=device or "cpu"))
+
+        return model.to(device) if device is not None else model
@@ -0,0 +1,85 @@
+import torch
+
+
+def discretize(x, dt, A, B):
+    """ the decay exp(dt * A) and the input dt * B * x of every step, [batch, length, d_inner, d_state] """
+    deltaA  = torch.exp(dt.unsqueeze(-1) * A)
+    deltaBx = (dt * x).unsqueeze(-1) * B.unsqueeze(2)
+
+    return deltaA, deltaBx
+
+
+def selective_scan_sequential(x, dt, A, B, C, D, initial_state=None):
+    """
+    Reference scan, one time step at a time: h_t = exp(dt_t * A) * h_t-1 + dt_t * B_t * x_t, y_t = C_t . h_t + D * x_t
+    x and dt are [batch, length, d_inner], A is [d_inner, d_state], B and C are [batch, length, d_state]
+    """
+    dtype = x.dtype
+    x, dt, A, B, C = x.float(), dt.float(), A.float(), B.float(), C.float()
+
+    batch, length, d_inner = x.shape
+    deltaA, deltaBx = discretize(x, dt, A, B)
+
+    state = initial_state.float() if initial_state is not None else x.new_zeros(batch, d_inner, A.size(-1))
+    ys = []
+
+    for t in range(length):
+        state = deltaA[:, t] * state + deltaBx[:, t]
+        ys.append(torch.einsum("bdn,bn->bd", state, C[:, t]))
+
+    y = torch.stack(ys, dim=1) if ys else x.new_zeros(batch, 0, d_inner)
+    y = y + x * D.float()
+
+    return y.to(dtype), state
+
+
+def selective_scan(x, dt, A, B, C, D, initial_state=None, chunk_size=64):
+    """
+    Same result as selective_scan_sequential. The sequence is split in chunks of chunk_size steps,
+    every chunk is scanned in log2(chunk_size) vectorized steps (Hillis-Steele), and only the last
+    state of each chunk is carried over to the next one in a loop over the chunks.
+    """
+    dtype = x.dtype
+    x, dt, A, B, C = x.float(), dt.float(), A.float(), B.float(), C.float()
+
+    batch, length, d_inner = x.shape
+    d_state = A.size(-1)
+
+    if length == 0:
+        return selective_scan_sequential(x, dt, A, B, C, D, initial_state)
+
+    chunk_size = min(chunk_size, length)
+    num_chunks = -(-length // chunk_size)
+    padding    = num_chunks * chunk_size - length
+
+    deltaA, deltaBx = discretize(x, dt, A, B)
+
+    # Padded steps keep the state as it is, so the last state is still the state after the last real step
+    if padding > 0:
+        deltaA  = torch.nn.functional.pad(deltaA, (0, 0, 0, 0, 0, padding), value=1.0)
+        deltaBx = torch.nn.functional.pad(deltaBx, (0, 0, 0, 0, 0, padding))
+
+    # a is the product of the decays since the start of the chunk, b the state reached from a zero state
+    a = deltaA.view(batch, num_chunks, chunk_size, d_inner, d_state)
+    b = deltaBx.view(batch, num_chunks, chunk_size, d_inner, d_state)
+
+    offset = 1
+    while offset < chunk_size:
+        b = torch.cat([b[:, :, :offset], torch.addcmul(b[:, :, offset:], a[:, :, offset:], b[:, :, :-offset])], dim=2)
+        a = torch.cat([a[:, :, :offset], a[:, :, offset:] * a[:, :, :-offset]], dim=2)
+        offset *= 2
+
+    state = initial_state.float() if initial_state is not None else x.new_zeros(batch, d_inner, d_state)
+    chunk_states = []
+
+    for chunk in range(num_chunks):
+        chunk_states.append(state)
+        state = torch.addcmul(b[:, chunk, -1], a[:, chunk, -1], state)
+
+    states = torch.addcmul(b, a, torch.stack(chunk_states, dim=1).unsqueeze(2))
+    states = states.view(batch, num_chunks * chunk_size, d_inner, d_state)[:, :length]
+
+    y = torch.einsum("bldn,bln->bld", states, C)
+    y = y + x * D.float()
+
+    return y.to(dtype), state
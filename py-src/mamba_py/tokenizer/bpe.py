@@ -0,0 +1,389 @@
+import re
+import heapq
+import random
+
+from collections import Counter
+
+
+def most_occurring_pair(arr):
+    # Create pairs of adjacent elements, ignoring pairs where the second element > 255
+    pairs = [(a, b) for a, b in zip(arr[:-1], arr[1:]) if b <= 255]
+
+    pair_counts = Counter(pairs)
+    if not pair_counts:
+        return None
+
+    most_common_pair = max(pair_counts, key=pair_counts.get)
+    return list(most_common_pair)
+
+
+
+def replace_pair(initial_list, pair_to_remove, replace_with):
+    result = []
+    i = 0
+
+    while i < len(initial_list):
+        if i + 1 < len(initial_list) and initial_list[i:i+2] == pair_to_remove:
+            result.append(replace_with)
+            i += 2
+
+        else:
+            result.append(initial_list[i])
+            i += 1
+
+    return result
+
+
+
+class PairIndex:
+    """
+    Incremental equivalent of calling most_occurring_pair and replace_pair on the whole sequence.
+
+    The sequence is kept as a doubly linked list over the original positions, and every pair
+    (a, b) with b <= 255 maps to the set of positions of its left element. A lazy max-heap
+    ordered by (count, first position) yields the same pair most_occurring_pair would pick,
+    and a merge only updates the pairs around the positions it rewrites.
+    """
+
+    def __init__(self, arr):
+        n = len(arr)
+
+        self.vals = list(arr)
+        self.next = list(range(1, n + 1))
+        self.prev = list(range(-1, n - 1))
+        self.size = n
+        self.head = 0 if n > 0 else -1
+        self.tail = n - 1
+
+        self.positions = {}
+        self.firsts = {}
+        self.heap = []
+
+        for i in range(n - 1):
+            self._add(self.vals[i], self.vals[i + 1], i)
+
+        for pair in self.positions:
+            self._push(pair)
+
+
+    def _add(self, a, b, pos):
+        if b > 255:
+            return None
+
+        pair = (a, b)
+        positions = self.positions.get(pair)
+
+        if positions is None:
+            positions = self.positions[pair] = set()
+            self.firsts[pair] = []
+
+        positions.add(pos)
+        heapq.heappush(self.firsts[pair], pos)
+        return pair
+
+    def _remove(self, a, b, pos):
+        if b > 255:
+            return None
+
+        pair = (a, b)
+        positions = self.positions.get(pair)
+
+        if positions is None or pos not in positions:
+            return None
+
+        positions.discard(pos)
+        return pair
+
+    def _first(self, pair):
+        positions = self.positions[pair]
+        firsts = self.firsts[pair]
+
+        while firsts[0] not in positions:
+            heapq.heappop(firsts)
+
+        return firsts[0]
+
+    def _push(self, pair):
+        positions = self.positions.get(pair)
+
+        if not positions:
+            self.positions.pop(pair, None)
+            self.firsts.pop(pair, None)
+            return
+
+        heapq.heappush(self.heap, (-len(positions), self._first(pair), pair))
+
+
+    def most_occurring_pair(self):
+        while self.heap:
+            count, first, pair = self.heap[0]
+            positions = self.positions.get(pair)
+
+            if positions and len(positions) == -count and self._first(pair) == first:
+                return list(pair)
+
+            heapq.heappop(self.heap)
+
+        return None
+
+
+    def replace_pair(self, pair, replace_with):
+        a, b = pair
+        pair = (a, b)
+        vals, next, prev = self.vals, self.next, self.prev
+        touched = {pair}
+
+        for i in sorted(self.positions.get(pair, ())):
+            # Skip occurrences consumed as the right half of the previous merge
+            if i not in self.positions[pair]:
+                continue
+
+            j = next[i]
+            k = next[j]
+            p = prev[i]
+
+            if p >= 0:
+                touched.add(self._remove(vals[p], a, p))
+            self._remove(a, b, i)
+            if k < len(vals):
+                touched.add(self._remove(b, vals[k], j))
+
+            vals[i] = replace_with
+            next[i] = k
+            if k < len(vals):
+                prev[k] = i
+            else:
+                self.tail = i
+            self.size -= 1
+
+            if p >= 0:
+                touched.add(self._add(vals[p], replace_with, p))
+            if k < len(vals):
+                touched.add(self._add(replace_with, vals[k], i))
+
+        touched.discard(None)
+        for touched_pair in touched:
+            self._push(touched_pair)
+
+        return touched
+
+
+    def pop_first(self):
+        """ removes the first element, when it was merged into a pair spanning the previous shard """
+        vals, next = self.vals, self.next
+        h = self.head
+        k = next[h]
+        touched = set()
+
+        if k < len(vals):
+            touched.add(self._remove(vals[h], vals[k], h))
+            self.prev[k] = -1
+            self.head = k
+        else:
+            self.head = self.tail = -1
+
+        self.size -= 1
+
+        touched.discard(None)
+        for touched_pair in touched:
+            self._push(touched_pair)
+
+        return touched
+
+    def set_last(self, val):
+        """ replaces the last element, when it was merged into a pair spanning the next shard """
+        vals = self.vals
+        t = self.tail
+        p = self.prev[t]
+        touched = set()
+
+        if p >= 0:
+            touched.add(self._remove(vals[p], vals[t], p))
+        vals[t] = val
+        if p >= 0:
+            touched.add(self._add(vals[p], val, p))
+
+        touched.discard(None)
+        for touched_pair in touched:
+            self._push(touched_pair)
+
+        return touched
+
+    def trailing_run(self, val):
+        """ returns the length of the run of val ending the sequence, and whether it spans all of it """
+        length = 0
+        i = self.tail
+
+        while i >= 0 and self.vals[i] == val:
+            length += 1
+            i = self.prev[i]
+
+        return length, i < 0
+
+    def pair_stats(self, pair):
+        if not self.positions.get(pair):
+            return 0, None
+
+        return len(self.positions[pair]), self._first(pair)
+
+
+    def to_list(self):
+        arr = []
+        i = self.head if self.size > 0 else len(self.vals)
+
+        while i < len(self.vals):
+            arr.append(self.vals[i])
+            i = self.next[i]
+
+        return arr
+
+
+
+# A chunk is a run of non-whitespace with the whitespace preceding it, e.g. " word" or "\n\nword"
+CHUNK_PATTERN = re.compile(r'\s*\S+|\s+')
+
+
+def iter_chunks(texts):
+    """ splits a stream of text pieces into chunks, carrying incomplete chunks across pieces """
+    carry = ""
+
+    for text in texts:
+        text = carry + text
+        matches = CHUNK_PATTERN.findall(text)
+
+        if not matches:
+            carry = ""
+            continue
+
+        # The last chunk may continue in the next piece
+        carry = matches.pop()
+        yield from matches
+
+    if carry:
+        yield carry
+
+
+def reservoir_sample(iterable, sample_size, seed=None):
+    rng = random.Random(seed)
+    sample = []
+
+    for i, item in enumerate(iterable):
+        if i < sample_size:
+            sample.append(item)
+            continue
+
+        j = rng.randrange(i + 1)
+        if j < sample_size:
+            sample[j] = item
+
+    return sample
+
+
+def pair_counts(word):
+    return Counter((a, b) for a, b in zip(word[:-1], word[1:]) if b <= 255)
+
+
+
+class ChunkPairIndex:
+    """
+    Same interface as PairIndex, over a chunk -> frequency table instead of the raw sequence.
+
+    Pair counts are weighted by chunk frequency and each pair maps to the chunks containing it,
+    so a merge only rewrites those chunks. Pairs never span two chunks, and ties are broken on
+    first occurrence over the chunks in insertion order.
+    """
+
+    def __init__(self, chunk_counts):
+        self.words = [[ord(c) for c in chunk] for chunk in chunk_counts]
+        self.freqs = list(chunk_counts.values())
+
+        self.counts = {}
+        self.where = {}
+        self.firsts = {}
+        self.heap = []
+
+        for w, word in enumerate(self.words):
+            for pair, count in pair_counts(word).items():
+                self._add(pair, w, count * self.freqs[w])
+
+        for pair in self.counts:
+            self._push(pair)
+
+
+    def _add(self, pair, w, count):
+        if pair not in self.counts:
+            self.counts[pair] = 0
+            self.where[pair] = set()
+            self.firsts[pair] = []
+
+        self.counts[pair] += count
+
+        if w not in self.where[pair]:
+            self.where[pair].add(w)
+            heapq.heappush(self.firsts[pair], w)
+
+    def _remove(self, pair, w, count):
+        self.counts[pair] -= count
+        self.where[pair].discard(w)
+
+    def _first(self, pair):
+        where = self.where[pair]
+        firsts = self.firsts[pair]
+
+        while firsts[0] not in where:
+            heapq.heappop(firsts)
+
+        w = firsts[0]
+        word = self.words[w]
+        a, b = pair
+
+        for i in range(len(word) - 1):
+            if word[i] == a and word[i + 1] == b:
+                return w, i
+
+    def _push(self, pair):
+        if not self.where.get(pair):
+            self.counts.pop(pair, None)
+            self.where.pop(pair, None)
+            self.firsts.pop(pair, None)
+            return
+
+        heapq.heappush(self.heap, (-self.counts[pair], self._first(pair), pair))
+
+
+    def most_occurring_pair(self):
+        while self.heap:
+            count, first, pair = self.heap[0]
+
+            if self.where.get(pair) and self.counts[pair] == -count and self._first(pair) == first:
+                return list(pair)
+
+            heapq.heappop(self.heap)
+
+        return None
+
+
+    def replace_pair(self, pair, replace_with):
+        pair = tuple(pair)
+        touched = {pair}
+
+        for w in sorted(self.where.get(pair, ())):
+            word = self.words[w]
+            freq = self.freqs[w]
+
+            old_counts = pair_counts(word)
+            word = self.words[w] = replace_pair(word, list(pair), replace_with)
+            new_counts = pair_counts(word)
+
+            for touched_pair, count in old_counts.items():
+                self._remove(touched_pair, w, count * freq)
+                touched.add(touched_pair)
+
+            for touched_pair, count in new_counts.items():
+                self._add(touched_pair, w, count * freq)
+                touched.add(touched_pair)
+
+        for touched_pair in touched:
+            self._push(touched_pair)
+
+        return touched
@@ -0,0 +1,270 @@
+import heapq
+import multiprocessing as mp
+
+from mamba_py.tokenizer.bpe import PairIndex
+
+
+class ShardGroup:
+    """
+    Holds the PairIndex of every shard assigned to one worker process, and applies the
+    merges chosen by the coordinator to them.
+    """
+
+    def __init__(self, shards, from_files=False):
+        self.indexes = {}
+
+        for s, shard in shards:
+            if from_files is True:
+                with open(shard, 'r') as f:
+                    shard = f.read()
+
+            self.indexes[s] = PairIndex([ord(c) for c in shard])
+
+    def _summary(self, s):
+        index = self.indexes[s]
+
+        if index.size == 0:
+            return None
+
+        return index.vals[index.head], index.vals[index.tail], index.tail
+
+    def stats(self):
+        stats = {}
+
+        for s, index in self.indexes.items():
+            pairs = {pair: index.pair_stats(pair) for pair in index.positions}
+            stats[s] = (pairs, self._summary(s))
+
+        return stats
+
+    def runs(self, val):
+        return {s: index.trailing_run(val) for s, index in self.indexes.items() if index.size > 0}
+
+    def merge(self, pair, id, pop_first, set_last):
+        stats = {}
+
+        for s, index in self.indexes.items():
+            if index.size == 0:
+                continue
+
+            touched = set()
+
+            if s in pop_first:
+                touched |= index.pop_first()
+
+            touched |= index.replace_pair(pair, id)
+
+            if s in set_last:
+                touched |= index.set_last(id)
+
+            pairs = {touched_pair: index.pair_stats(touched_pair) for touched_pair in touched}
+            stats[s] = (pairs, self._summary(s))
+
+        return stats
+
+
+def _worker_loop(conn, shards, from_files):
+    group = ShardGroup(shards, from_files)
+
+    while True:
+        command, args = conn.recv()
+
+        if command == 'close':
+            break
+
+        conn.send(getattr(group, command)(*args))
+
+    conn.close()
+
+
+
+class ShardedPairIndex:
+    """
+    Same interface as PairIndex, over the concatenation of several shards that are held by
+    worker processes. Workers count pairs in their shards and apply merges locally, while
+    this coordinator sums their counts, tracks the pairs spanning two consecutive shards and
+    picks each merge, so that the merges are those of a PairIndex over the joined text.
+
+    Positions are (shard, position in shard), so ties are still broken on first occurrence.
+    """
+
+    def __init__(self, shards, num_workers, from_files=False):
+        shards = list(enumerate(shards))
+        num_workers = max(1, min(num_workers, len(shards)))
+
+        self.conns = []
+        self.processes = []
+
+        for w in range(num_workers):
+            # Contiguous groups of shards per worker
+            group = shards[w * len(shards) // num_workers:(w + 1) * len(shards) // num_workers]
+            parent_conn, child_conn = mp.Pipe()
+
+            process = mp.Process(target=_worker_loop, args=(child_conn, group, from_files), daemon=True)
+            process.start()
+
+            self.conns.append(parent_conn)
+            self.processes.append(process)
+
+        self.sources = {}
+        self.totals = {}
+        self.heap = []
+
+        self.summaries = {}
+        self.boundaries = {}
+
+        touched = self._update(self._broadcast('stats'))
+        touched |= self._update_boundaries()
+
+        for pair in touched:
+            self._push(pair)
+
+
+    def _broadcast(self, command, *args):
+        for conn in self.conns:
+            conn.send((command, args))
+
+        results = {}
+        for conn in self.conns:
+            results.update(conn.recv())
+
+        return results
+
+    def close(self):
+        for conn in self.conns:
+            conn.send(('close', ()))
+            conn.close()
+
+        for process in self.processes:
+            process.join()
+
+        self.conns = []
+        self.processes = []
+
+
+    def _set_source(self, pair, key, count, first):
+        sources = self.sources.setdefault(pair, {})
+        old_count = sources[key][0] if key in sources else 0
+
+        if count == 0:
+            sources.pop(key, None)
+        else:
+            sources[key] = (count, first)
+
+        self.totals[pair] = self.totals.get(pair, 0) + count - old_count
+
+        if not sources:
+            del self.sources[pair]
+            del self.totals[pair]
+
+    def _update(self, stats):
+        touched = set()
+
+        for s, (pairs, summary) in stats.items():
+            for pair, (count, first) in pairs.items():
+                self._set_source(pair, s, count, (s, first) if first is not None else None)
+                touched.add(pair)
+
+            if summary is None:
+                self.summaries.pop(s, None)
+            else:
+                self.summaries[s] = summary
+
+        return touched
+
+    def _update_boundaries(self):
+        touched = set()
+        order = sorted(self.summaries)
+        boundaries = {}
+
+        for s, t in zip(order[:-1], order[1:]):
+            a = self.summaries[s][1]
+            b = self.summaries[t][0]
+
+            if b <= 255:
+                boundaries[s] = ((a, b), (s, self.summaries[s][2]), t)
+
+        for s in set(self.boundaries) | set(boundaries):
+            old = self.boundaries.get(s)
+            new = boundaries.get(s)
+
+            if old == new:
+                continue
+
+            # Boundary keys are negative, so they never collide with shard keys
+            if old is not None:
+                self._set_source(old[0], -1 - s, 0, None)
+                touched.add(old[0])
+
+            if new is not None:
+                self._set_source(new[0], -1 - s, 1, new[1])
+                touched.add(new[0])
+
+        self.boundaries = boundaries
+        return touched
+
+    def _first(self, pair):
+        return min(first for count, first in self.sources[pair].values())
+
+    def _push(self, pair):
+        if pair not in self.totals:
+            return
+
+        heapq.heappush(self.heap, (-self.totals[pair], self._first(pair), pair))
+
+
+    def most_occurring_pair(self):
+        while self.heap:
+            count, first, pair = self.heap[0]
+
+            if self.totals.get(pair) == -count and self._first(pair) == first:
+                return list(pair)
+
+            heapq.heappop(self.heap)
+
+        return None
+
+
+    def _merged_boundaries(self, pair):
+        a, b = pair
+        matching = [s for s, boundary in self.boundaries.items() if boundary[0] == pair]
+
+        if not matching:
+            return []
+
+        if a != b:
+            # Occurrences of (a, b) can not overlap, every boundary occurrence is merged
+            return matching
+
+        # Runs of a spanning shards are merged from their leftmost element, so whether the last
+        # element of a shard is still free depends on the parity of the run up to it
+        runs = self._broadcast('runs', a)
+        merged = []
+        popped = set()
+
+        for s in sorted(self.boundaries):
+            length, whole = runs[s]
+            free = length - (1 if whole and s in popped else 0)
+
+            if self.boundaries[s][0] == pair and free % 2 == 1:
+                merged.append(s)
+                popped.add(self.boundaries[s][2])
+
+        return merged
+
+
+    def replace_pair(self, pair, replace_with):
+        pair = tuple(pair)
+        merged = self._merged_boundaries(pair)
+
+        set_last = set(merged)
+        pop_first = set(self.boundaries[s][2] for s in merged)
+
+        touched = self._update(self._broadcast('merge', pair, replace_with, pop_first, set_last))
+        touched |= self._update_boundaries()
+        touched.add(pair)
+
+        for touched_pair in touched:
+            self._push(touched_pair)
+
+        return touched
@@ -0,0 +1,24 @@
+import struct
+
+
+class Token:
+    def __init__(self, byte, prev):
+        self.byte = byte
+        self.prev = prev
+
+    def pack(self):
+        return struct.pack("=B H", ord(self.byte), self.prev)
+
+    def __str__(self):
+        return f"{self.byte}, {self.prev}"
+
+    def to_binary(self):
+        return self.pack()
+
+    @classmethod
+    def from_binary(cls, data):
+        if len(data) != 3:
+            raise ValueError("Data has invalid length, Exprected 3 bytes.")
+
+        byte, prev = struct.unpack("=B H", data)
+        return cls(chr(byte), prev)
@@ -0,0 +1,238 @@
+import numpy as np
+import multiprocessing as mp
+
+from collections import Counter
+
+from mamba_py.tokenizer.token    import Token
+from mamba_py.tokenizer.vocab    import Vocab
+from mamba_py.tokenizer.bpe      import PairIndex, ChunkPairIndex, iter_chunks, reservoir_sample
+from mamba_py.tokenizer.parallel import ShardedPairIndex
+
+
+class Tokenizer:
+    def __init__(self):
+        self.vocab = Vocab()
+        self._init_byte_level()
+
+    def _init_byte_level(self):
+        self.vocab.clear()
+
+        for i in range(256):
+            token = Token(chr(i), 0)
+            self.vocab += token
+
+
+    def train(self, text, target_length=None, num_workers=None, from_files=False):
+        """
+        Trains on a string, or on a list / iterable of shards (strings, or file paths if from_files
+        is True) as if they were concatenated. With num_workers > 1 the shards are spread across
+        worker processes, and a single string is split into num_workers shards
+        """
+        shards = [text] if isinstance(text, str) else list(text)
+        num_workers = num_workers or 1
+
+        if num_workers > 1 and from_files is False and len(shards) == 1:
+            text = shards[0]
+            shards = [text[i * len(text) // num_workers:(i + 1) * len(text) // num_workers] for i in range(num_workers)]
+
+        if num_workers > 1:
+            arr = ShardedPairIndex(shards, num_workers, from_files)
+        else:
+            arr = PairIndex([ord(c) for shard in shards for c in self._read_shard(shard, from_files)])
+
+        try:
+            self._train(arr, target_length)
+        finally:
+            if num_workers > 1:
+                arr.close()
+
+    def train_chunks(self, text, target_length=None, sample_size=None, seed=None, chunk_size=1 << 20):
+        """
+        Trains on the unique whitespace-delimited chunks of a string, text file or iterable of strings,
+        weighted by frequency. With sample_size, only a reservoir sample of that many chunks is kept
+        """
+        chunks = iter_chunks(self._iter_chunks(text, chunk_size))
+
+        if sample_size is not None:
+            chunks = reservoir_sample(chunks, sample_size, seed)
+
+        arr = ChunkPairIndex(Counter(chunks))
+        self._train(arr, target_length)
+
+    def _read_shard(self, shard, from_files):
+        if from_files is False:
+            return shard
+
+        with open(shard, 'r') as f:
+            return f.read()
+
+    def _train(self, arr, target_length):
+        while True:
+            if target_length is not None:
+                if len(self.vocab) >= target_length:
+                    break
+
+            pair = arr.most_occurring_pair()
+
+            if pair is None:
+                break
+
+            byte = chr(pair[1])
+            prev = pair[0]
+            token = Token(byte, prev)
+            id = self.vocab + token
+
+            arr.replace_pair(pair, id)
+
+
+    def _decode_one(self, id):
+        return self.vocab.decode_table()[id]
+
+    def _as_id_list(self, ids):
+        if isinstance(ids, np.ndarray):
+            return ids.ravel().tolist()
+
+        if isinstance(ids, (int, np.integer)):
+            return [int(ids)]
+
+        return ids
+
+    def decode(self, ids):
+        strings = self.vocab.decode_table()
+        return ''.join(map(strings.__getitem__, self._as_id_list(ids)))
+
+    def decode_batch(self, sequences, offsets=None):
+        """ decodes a list of sequences, or a flat array split by offsets as returned by encode_batch """
+        if offsets is not None:
+            sequences = [sequences[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+
+        return [self.decode(ids) for ids in sequences]
+
+    def _iter_chunks(self, source, chunk_size):
+        if isinstance(source, str):
+            yield source
+
+        elif hasattr(source, 'read'):
+            while True:
+                chunk = source.read(chunk_size)
+                if not chunk:
+                    break
+
+                yield chunk
+
+        else:
+            yield from source
+
+    def encode_stream(self, source, chunk_size=1 << 20):
+        """ yields the ids of a string, text file or iterable of strings, carrying the current match across chunks """
+        index = self.vocab.index
+        prev = 0
+
+        for chunk in self._iter_chunks(source, chunk_size):
+            for byte in chunk:
+                next = index.get((prev, byte), 0)
+
+                if next != 0:
+                    prev = next
+                    continue
+
+                if prev != 0:
+                    yield prev
+                    prev = index.get((0, byte), 0)
+
+                if prev == 0:
+                    yield 0
+
+        if prev != 0:
+            yield prev
+
+    def encode(self, text):
+        return list(self.encode_stream(text))
+
+    def _id_dtype(self):
+        return np.uint16 if len(self.vocab) <= (1 << 16) else np.uint32
+
+    def _encode_array(self, text, dtype):
+        return np.fromiter(self.encode_stream(text), dtype=dtype)
+
+    def encode_batch(self, texts, num_workers=1, flat=False, chunksize=None):
+        """
+        Encodes a list of documents into uint16 / uint32 arrays, across a pool of num_workers
+        processes when num_workers > 1. Returns one array per document, or a (tokens, offsets)
+        pair when flat is True
+        """
+        dtype = self._id_dtype()
+        num_workers = num_workers or 1
+
+        if num_workers <= 1 or len(texts) <= 1:
+            arrays = [self._encode_array(text, dtype) for text in texts]
+
+        else:
+            tokens = self.vocab.records
+            chunksize = chunksize or max(1, len(texts) // (num_workers * 8))
+
+            with mp.Pool(num_workers, initializer=_init_worker, initargs=(tokens, dtype)) as pool:
+                arrays = pool.map(_encode_worker, texts, chunksize=chunksize)
+
+        if flat is False:
+            return arrays
+
+        offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+        np.cumsum([len(array) for array in arrays], out=offsets[1:])
+
+        flat_tokens = np.concatenate(arrays) if arrays else np.zeros(0, dtype=dtype)
+        return flat_tokens, offsets
+
+
+    def add_one_special_token(self, text):
+        prev = 0
+        byte = None
+
+        for i in range(len(text)):
+            byte = text[i]
+            token = self.vocab.find(byte, prev)
+
+            if token:
+                prev = token
+                continue
+
+            token = Token(byte, prev)
+            prev = self.vocab + token
+
+        return prev
+
+    def add_special_token(self, texts):
+        if not isinstance(texts, list):
+            texts = [texts]
+
+        for i in range(len(texts)):
+            text = texts[i]
+            self.add_one_special_token(text)
+
+    def __str__(self):
+        return str(self.vocab)
+
+    def to_file(self, file):
+        self.vocab.to_file(file)
+
+    def from_file(self, file):
+        self.vocab.from_file(file)
+
+
+
+_worker_tokenizer = None
+_worker_dtype = None
+
+
+def _init_worker(tokens, dtype):
+    global _worker_tokenizer, _worker_dtype
+
+    tokenizer = Tokenizer()
+    tokenizer.vocab.from_array(tokens)
+
+    _worker_tokenizer = tokenizer
+    _worker_dtype = dtype
+
+
+def _encode_worker(text):
+    return _worker_tokenizer._encode_array(text, _worker_dtype)
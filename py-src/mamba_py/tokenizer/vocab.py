@@ -0,0 +1,200 @@
+import os
+import numpy as np
+
+from mamba_py.tokenizer.token import Token
+
+
+class TokenView:
+    def __init__(self, vocab):
+        self.vocab = vocab
+
+    def __getitem__(self, id):
+        return self.vocab[id]
+
+    def __len__(self):
+        return len(self.vocab)
+
+    def __iter__(self):
+        return iter(self.vocab)
+
+
+class Vocab:
+    # Same packed layout as Token.pack ("=B H") and vocab_t in c-src/main.c
+    dtype = np.dtype([('byte', np.uint8), ('prev', np.uint16)])
+
+    def __init__(self):
+        self.clear()
+
+    def __getitem__(self, id):
+        if id < 0:
+            id += self.vocab_size
+
+        if id < 0 or id >= self.vocab_size:
+            raise IndexError("Token id out of range")
+
+        byte, prev = self.array[id].item()
+        return Token(chr(byte), prev)
+
+    def __setitem__(self, id, token):
+        if id < 0:
+            id += self.vocab_size
+
+        old = self[id]
+        self.array[id] = self._to_row(token)
+
+        self._unindex(old, id)
+        self._index(token, id)
+
+        # Later tokens may be built on top of this one, rebuild the table on next use
+        self.strings = []
+
+    def __iter__(self):
+        for id in range(self.vocab_size):
+            yield self[id]
+
+    @property
+    def tokens(self):
+        return TokenView(self)
+
+    @property
+    def records(self):
+        return self.array[:self.vocab_size]
+
+    def clear(self):
+        self.array = np.zeros(256, dtype=self.dtype)
+        self.vocab_size = 0
+        self.index = {}
+        self.strings = []
+
+    def _to_row(self, token):
+        byte = ord(token.byte)
+
+        if byte > 255 or not 0 <= token.prev <= 0xFFFF:
+            raise ValueError("Token does not fit the packed layout, Expected byte < 256 and prev < 65536.")
+
+        return byte, token.prev
+
+    def _index(self, token, id):
+        key = (token.prev, token.byte)
+        found = self.index.get(key)
+
+        if found is None or id < found:
+            self.index[key] = id
+
+    def _unindex(self, token, id):
+        key = (token.prev, token.byte)
+
+        if self.index.get(key) != id:
+            return
+
+        del self.index[key]
+
+        # Fall back to the next token with the same (prev, byte), if any
+        tokens = self.records[id + 1:]
+        found = np.flatnonzero((tokens['prev'] == token.prev) & (tokens['byte'] == ord(token.byte)))
+
+        if len(found):
+            self.index[key] = id + 1 + int(found[0])
+
+    def __len__(self):
+        return self._get_size()
+
+    def _get_size(self):
+        return self.vocab_size
+
+    def __iadd__(self, token):
+        self._add_token(token)
+        return self
+
+    def __add__(self, token):
+        return self._add_token(token)
+
+    def _add_token(self, token):
+        row = self._to_row(token)
+
+        if self.vocab_size == len(self.array):
+            array = np.zeros(max(256, 2 * len(self.array)), dtype=self.dtype)
+            array[:self.vocab_size] = self.array[:self.vocab_size]
+            self.array = array
+
+        self.array[self.vocab_size] = row
+        self.vocab_size += 1
+        self._index(token, self.vocab_size - 1)
+        return self.vocab_size - 1
+
+    def find(self, byte, prev):
+        return self.index.get((prev, byte), 0)
+
+    def _token_string(self, id):
+        text = ""
+        while True:
+            byte, prev = self.array[id].item()
+
+            text += chr(byte)
+            if prev == 0:
+                break
+
+            id = prev
+
+        return text[::-1]
+
+    def decode_table(self):
+        strings = self.strings
+        start = len(strings)
+
+        tokens = self.records[start:]
+        byte_list = tokens['byte'].tolist()
+        prev_list = tokens['prev'].tolist()
+
+        for id, byte, prev in zip(range(start, self.vocab_size), byte_list, prev_list):
+            if prev == 0:
+                strings.append(chr(byte))
+            elif prev < id:
+                strings.append(strings[prev] + chr(byte))
+            else:
+                strings.append(self._token_string(id))
+
+        return strings
+
+    def __str__(self):
+        text = '['
+        n_tokens = len(self)
+
+        for i in range(n_tokens):
+            text += '{' + str(self[i]) + ('}, ' if i < n_tokens - 1 else '}]')
+
+        return text
+
+
+    def from_array(self, array):
+        self.clear()
+
+        array = np.asarray(array, dtype=self.dtype)
+        self.array = array
+        self.vocab_size = len(array)
+
+        # Insert in reverse so that the first token with a given (prev, byte) wins, as in find
+        keys = list(zip(array['prev'].tolist(), map(chr, array['byte'].tolist())))
+        self.index = dict(zip(reversed(keys), range(self.vocab_size - 1, -1, -1)))
+
+
+    def to_file(self, file):
+        tmp_file = f"{file}.tmp.{os.getpid()}"
+
+        with open(tmp_file, 'wb') as f:
+            self.records.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(tmp_file, file)
+
+    def from_file(self, file, mmap=False):
+        count = os.path.getsize(file) // self.dtype.itemsize
+
+        if mmap is True and count > 0:
+            # Copy-on-write, so tokens can still be set or added without touching the file
+            array = np.memmap(file, dtype=self.dtype, mode='c', shape=(count,))
+        else:
+            array = np.fromfile(file, dtype=self.dtype, count=count)
+
+        self.from_array(array)
@@ -0,0 +1,135 @@
+import queue
+import threading
+
+import torch
+import numpy as np
+
+from mamba_py.utils.util import Util
+
+
+class BatchLoader:
+    """
+    Lazy (batch_size, seq_length) batches over a token array, which may be memory-mapped.
+    Batches are only built when requested, and iterating prefetches the next ones on a
+    background thread into a bounded queue.
+    """
+
+    def __init__(self, input_ids, seq_length, batch_size, device=None, prefetch=2, pin_memory=False):
+        if not isinstance(input_ids, np.ndarray):
+            input_ids = np.asarray(input_ids)
+
+        self.input_ids   = input_ids
+        self.seq_length  = seq_length
+        self.batch_size  = batch_size
+        self.device      = device or Util.GetDevice()
+        self.prefetch    = prefetch
+        self.pin_memory  = pin_memory and self.device.type == "cuda"
+
+        self.num_batches = len(input_ids) // (seq_length * batch_size)
+        self.cursor      = 0
+
+
+    def __len__(self):
+        return self.num_batches
+
+
+    @property
+    def shape(self):
+        return (self.num_batches, self.batch_size, self.seq_length)
+
+
+    def __getitem__(self, batch):
+        if batch < 0:
+            batch += self.num_batches
+
+        if batch < 0 or batch >= self.num_batches:
+            raise IndexError("Batch index out of range")
+
+        return self.ToDevice(self.Build(batch))
+
+
+    def Build(self, batch):
+        batch_elements = self.seq_length * self.batch_size
+
+        array = self.input_ids[batch * batch_elements:(batch + 1) * batch_elements]
+        array = array.astype(np.int64).reshape((self.batch_size, self.seq_length))
+
+        tensor = torch.from_numpy(array)
+        if self.pin_memory is True:
+            tensor = tensor.pin_memory()
+
+        return tensor
+
+
+    def ToDevice(self, tensor):
+        return tensor.to(self.device, non_blocking=self.pin_memory)
+
+
+    def __iter__(self):
+        batches = range(self.cursor, self.num_batches)
+
+        if self.prefetch > 0:
+            batches = self.Prefetch(batches)
+        else:
+            batches = ((batch, self.Build(batch)) for batch in batches)
+
+        try:
+            for batch, tensor in batches:
+                # The cursor is the next batch to hand out, so it only moves once a batch is consumed
+                self.cursor = batch + 1
+                yield self.ToDevice(tensor)
+
+        finally:
+            batches.close()
+
+        self.EndEpoch()
+
+
+    def EndEpoch(self):
+        self.cursor = 0
+
+
+    def state_dict(self):
+        return {"cursor": self.cursor}
+
+
+    def load_state_dict(self, state):
+        self.cursor = state["cursor"]
+
+
+    def Prefetch(self, batches):
+        prefetched = queue.Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+
+        def put(item):
+            # Timed, so the producer sees stop when the consumer quits with a full queue
+            while not stop.is_set():
+                try:
+                    prefetched.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+
+            return False
+
+        def produce():
+            for batch in batches:
+                if not put((batch, self.Build(batch))):
+                    return
+
+            put(None)
+
+        thread = threading.Thread(target=produce, daemon=True)
+        thread.start()
+
+        try:
+            while True:
+                item = prefetched.get()
+                if item is None:
+                    break
+
+                yield item
+
+        finally:
+            stop.set()
+            thread.join()
@@ -0,0 +1,180 @@
+import os
+import re
+import queue
+import random
+import threading
+import numpy as np
+import torch
+
+
+class Checkpoint:
+    """
+    Periodic training checkpoints in checkpoint_dir, written by a background thread.
+
+    Save copies the model and optimizer state to the CPU on the calling thread, so training can
+    go on while the snapshot is written. Files are written to a temporary name and renamed, so a
+    crash never leaves a partial checkpoint behind, and only the last keep checkpoints are kept.
+    """
+
+    pattern = re.compile(r'checkpoint_(\d+)\.pt$')
+
+
+    def __init__(self, checkpoint_dir, keep=3):
+        self.checkpoint_dir = checkpoint_dir
+        self.keep           = keep
+        self.error          = None
+
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+        # At most one snapshot waits while another is written, which bounds the memory held by snapshots
+        self.queue  = queue.Queue(maxsize=1)
+        self.thread = threading.Thread(target=self.WriteLoop, daemon=True)
+        self.thread.start()
+
+
+    @staticmethod
+    def Snapshot(value):
+        if isinstance(value, torch.Tensor):
+            return value.detach().to("cpu", copy=True)
+
+        if isinstance(value, dict):
+            return {key: Checkpoint.Snapshot(item) for key, item in value.items()}
+
+        if isinstance(value, (list, tuple)):
+            return type(value)(Checkpoint.Snapshot(item) for item in value)
+
+        return value
+
+
+    @staticmethod
+    def RngState():
+        state = {"python": random.getstate(), "numpy": np.random.get_state(), "torch": torch.get_rng_state()}
+
+        if torch.cuda.is_available():
+            state["cuda"] = torch.cuda.get_rng_state_all()
+
+        return state
+
+
+    @staticmethod
+    def SetRngState(state):
+        random.setstate(state["python"])
+        np.random.set_state(state["numpy"])
+        torch.set_rng_state(state["torch"])
+
+        if "cuda" in state and torch.cuda.is_available():
+            torch.cuda.set_rng_state_all(state["cuda"])
+
+
+    def Path(self, step):
+        return os.path.join(self.checkpoint_dir, f"checkpoint_{step:08d}.pt")
+
+
+    def Entries(self):
+        entries = []
+
+        for name in os.listdir(self.checkpoint_dir):
+            match = self.pattern.match(name)
+
+            if match is not None:
+                entries.append((int(match.group(1)), os.path.join(self.checkpoint_dir, name)))
+
+        return sorted(entries)
+
+
+    def Latest(self):
+        entries = self.Entries()
+        return entries[-1][1] if entries else None
+
+
+    def Save(self, step, model, optimizer, batches=None, epoch=0):
+        self.RaiseError()
+
+        state = {
+            "step":      step,
+            "epoch":     epoch,
+            "model":     Checkpoint.Snapshot(model.state_dict()),
+            "optimizer": Checkpoint.Snapshot(optimizer.state_dict()),
+            "batches":   batches.state_dict() if batches is not None else None,
+            "rng":       Checkpoint.RngState(),
+        }
+
+        self.queue.put(state)
+
+
+    def Load(self, path=None, map_location="cpu"):
+        path = path or self.Latest()
+
+        if path is None:
+            return None
+
+        return torch.load(path, map_location=map_location, weights_only=False)
+
+
+    def Restore(self, state, model, optimizer, batches=None):
+        model.load_state_dict(state["model"])
+        optimizer.load_state_dict(state["optimizer"])
+
+        if batches is not None and state["batches"] is not None:
+            batches.load_state_dict(state["batches"])
+
+        Checkpoint.SetRngState(state["rng"])
+        return state["step"], state["epoch"]
+
+
+    def WriteLoop(self):
+        while True:
+            state = self.queue.get()
+
+            try:
+                if state is not None:
+                    self.Write(state)
+            except Exception as error:
+                self.error = error
+            finally:
+                self.queue.task_done()
+
+            if state is None:
+                break
+
+
+    def Write(self, state):
+        path = self.Path(state["step"])
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+
+        with open(tmp_path, 'wb') as f:
+            torch.save(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(tmp_path, path)
+        self.Prune()
+
+
+    def Prune(self):
+        if self.keep is None:
+            return
+
+        entries = self.Entries()
+
+        for _, path in entries[:max(0, len(entries) - self.keep)]:
+            os.remove(path)
+
+
+    def RaiseError(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise RuntimeError("Writing a checkpoint failed") from error
+
+
+    def Wait(self):
+        self.queue.join()
+        self.RaiseError()
+
+
+    def Close(self):
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+
+        self.RaiseError()
@@ -0,0 +1,58 @@
+import torch
+
+
+class ChunkedCrossEntropy(torch.autograd.Function):
+    """
+    Mean cross-entropy of (hidden @ weight.T) against labels, computed chunk_size rows at a time.
+
+    The gradients of hidden and weight are accumulated during the forward pass, so only one
+    [chunk_size, vocab_size] block of logits exists at any time, instead of the full
+    [batch * seq_length, vocab_size] logits and their softmax saved for backward.
+    """
+
+    @staticmethod
+    def forward(ctx, hidden, weight, labels, chunk_size, compute_grad):
+        num_rows = hidden.size(0)
+        device_type = hidden.device.type
+
+        loss = torch.zeros((), dtype=torch.float32, device=hidden.device)
+        grad_hidden = torch.empty_like(hidden, dtype=torch.float32) if compute_grad else None
+        grad_weight = torch.zeros_like(weight, dtype=torch.float32) if compute_grad else None
+
+        weight_fp32 = weight.float()
+
+        with torch.autocast(device_type=device_type, enabled=False):
+            for start in range(0, num_rows, chunk_size):
+                hidden_chunk = hidden[start:start + chunk_size].float()
+                labels_chunk = labels[start:start + chunk_size]
+                rows = torch.arange(len(labels_chunk), device=hidden.device)
+
+                logits = hidden_chunk @ weight_fp32.t()
+                logsumexp = torch.logsumexp(logits, dim=-1)
+                loss += (logsumexp - logits[rows, labels_chunk]).sum()
+
+                if compute_grad is False:
+                    continue
+
+                # d(loss)/d(logits) = softmax - one_hot, reusing the logits buffer
+                probs = logits.sub_(logsumexp[:, None]).exp_()
+                probs[rows, labels_chunk] -= 1
+
+                grad_hidden[start:start + chunk_size] = probs @ weight_fp32
+                grad_weight.addmm_(probs.t(), hidden_chunk)
+
+        if compute_grad is True:
+            ctx.save_for_backward(grad_hidden.div_(num_rows).to(hidden.dtype), grad_weight.div_(num_rows).to(weight.dtype))
+
+        return loss / num_rows
+
+
+    @staticmethod
+    def backward(ctx, grad_output):
+        grad_hidden, grad_weight = ctx.saved_tensors
+        return grad_hidden * grad_output, grad_weight * grad_output, None, None, None
+
+
+def chunked_cross_entropy(hidden, weight, labels, chunk_size=1024):
+    compute_grad = torch.is_grad_enabled() and (hidden.requires_grad or weight.requires_grad)
+    return ChunkedCrossEntropy.apply(hidden, weight, labels, chunk_size, compute_grad)
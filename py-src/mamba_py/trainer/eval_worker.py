@@ -0,0 +1,105 @@
+import time
+import queue
+import torch
+import torch.multiprocessing as mp
+
+from types import MethodType
+
+from mamba_py.trainer.generate_model import GenerateModel
+
+
+def _worker_loop(model_class, config, snapshot, requests, results, tokenizer, seed_text, num_predict, device, num_threads):
+    torch.set_num_threads(num_threads)
+
+    model = model_class(config).to(device)
+    model.generate_text = MethodType(GenerateModel.GenerateText, model)
+    model.eval()
+
+    while True:
+        step = requests.get()
+
+        if step is None:
+            break
+
+        # The snapshot is only written while no request is pending, so it can be read without a lock
+        model.load_state_dict(snapshot)
+        time_start = time.perf_counter()
+
+        try:
+            text = model.generate_text(tokenizer, seed_text, num_predict)
+            results.put((step, text, time.perf_counter() - time_start, None))
+        except Exception as error:
+            results.put((step, None, time.perf_counter() - time_start, repr(error)))
+
+
+
+class EvalWorker:
+    """
+    Runs model.generate_text in a separate process, on a snapshot of the weights in shared memory.
+
+    Publish copies the current weights into the snapshot and queues a generation, or does
+    nothing while the previous one is still running, and Poll collects the finished ones
+    without waiting. The worker rebuilds the model as model_class(config), so both have to be
+    importable from a module (not defined in a notebook).
+    """
+
+    def __init__(self, model, tokenizer, seed_text, num_predict, config=None, device=None, num_threads=1):
+        context = mp.get_context("spawn")
+        config  = config if config is not None else model.config
+
+        self.snapshot = {name: tensor.detach().to("cpu", copy=True).share_memory_() for name, tensor in model.state_dict().items()}
+        self.requests = context.Queue(maxsize=1)
+        self.results  = context.Queue()
+        self.pending  = 0
+
+        device = device or next(model.parameters()).device
+        args = (type(model), config, self.snapshot, self.requests, self.results, tokenizer, seed_text, num_predict, str(device), num_threads)
+
+        self.process = context.Process(target=_worker_loop, args=args, daemon=True)
+        self.process.start()
+
+
+    def Publish(self, model, step):
+        if self.pending > 0 or self.process.is_alive() is False:
+            return False
+
+        with torch.no_grad():
+            for name, tensor in model.state_dict().items():
+                self.snapshot[name].copy_(tensor.detach())
+
+        self.requests.put(step)
+        self.pending += 1
+
+        return True
+
+
+    def Poll(self, timeout=None):
+        """ finished (step, text, seconds, error) results, waiting up to timeout seconds for the pending one """
+        results = []
+
+        while self.pending > 0:
+            try:
+                if timeout is None:
+                    result = self.results.get_nowait()
+                else:
+                    result = self.results.get(timeout=timeout)
+            except queue.Empty:
+                break
+
+            self.pending -= 1
+            results.append(result)
+
+        return results
+
+
+    def Close(self, timeout=60):
+        results = self.Poll(timeout) if self.process.is_alive() else []
+
+        if self.process.is_alive():
+            self.requests.put(None)
+            self.process.join(timeout=5)
+
+        if self.process.is_alive():
+            self.process.terminate()
+
+        return results
@@ -0,0 +1,157 @@
+import torch
+import numpy as np
+
+from mamba_py.utils.metaclasses        import CallableMeta
+from mamba_py.utils.util               import Util
+from mamba_py.trainer.token_cache      import TokenCache
+from mamba_py.trainer.batch_loader     import BatchLoader
+from mamba_py.trainer.sequence_sampler import SequenceSampler
+from mamba_py.trainer.stream_loader    import StreamLoader
+
+
+class GenerateData(metaclass=CallableMeta):
+    @staticmethod
+    def __call__(dataset, tokenizer, seq_length, batch_size, split="train", dataset_id=None, cache_dir=None, cache_max_bytes=None, prefetch=2, pin_memory=False, num_workers=None, shuffle=False, seed=0, eod_token=None, val_fraction=None, stream=False):
+        dataset     = dataset
+        tokenizer   = tokenizer
+        seq_length  = seq_length
+        batch_size  = batch_size
+        vocab_size  = len(tokenizer.vocab)
+
+        input_ids = GenerateData.LoadTokens(dataset, tokenizer, vocab_size, split, dataset_id, cache_dir, cache_max_bytes, num_workers, eod_token)
+
+        if val_fraction is not None:
+            input_ids, val_ids = GenerateData.SplitValidation(input_ids, val_fraction)
+
+        batches, num_batches =  GenerateData.BatchSequences(input_ids, seq_length, batch_size, prefetch, pin_memory, shuffle, seed, eod_token, stream)
+        GenerateData.Log(seq_length, num_batches, batch_size, batches)
+
+        if val_fraction is not None:
+            val_batches, num_val_batches = GenerateData.BatchSequences(val_ids, seq_length, batch_size, prefetch, pin_memory)
+            Util.Tee("config_log.txt", f"Validation split contains {num_val_batches} batches ({Util.RoundNumber(len(val_ids))} tokens)")
+
+            return batches, num_batches, val_batches
+
+        return batches, num_batches
+
+
+    @staticmethod
+    def LoadTokens(dataset, tokenizer, vocab_size, split="train", dataset_id=None, cache_dir=None, cache_max_bytes=None, num_workers=None, eod_token=None):
+        GenerateData.CheckEodToken(eod_token, vocab_size)
+
+        if dataset_id is None:
+            dataset_id = getattr(dataset[split], "_fingerprint", None)
+
+        cache = None
+        if cache_dir is not None and dataset_id is not None:
+            cache = TokenCache(cache_dir, cache_max_bytes)
+            key = TokenCache.Key(dataset_id, split, tokenizer, clip_max=vocab_size - 1, eod_token=eod_token, encoding=GenerateData.EncodingMode(num_workers, eod_token))
+
+            input_ids = cache.Load(key)
+            if input_ids is not None:
+                Util.Tee("config_log.txt", f"Loaded {Util.RoundNumber(len(input_ids))} cached tokens from {cache.Path(key)}")
+                return input_ids
+
+        texts = dataset[split]["text"]
+
+        input_ids = GenerateData.EncodeTexts(texts, tokenizer, vocab_size, num_workers, eod_token)
+        input_ids = GenerateData.ClipOutOfVocab(input_ids, vocab_size)
+
+        if cache is not None:
+            input_ids = cache.Store(key, input_ids)
+
+        return input_ids
+
+
+    @staticmethod
+    def SplitValidation(input_ids, val_fraction):
+        if not isinstance(input_ids, np.ndarray):
+            input_ids = np.asarray(input_ids)
+
+        # Views over the same (possibly memory-mapped) array, the tail is held out
+        split = len(input_ids) - int(len(input_ids) * val_fraction)
+        return input_ids[:split], input_ids[split:]
+
+
+    @staticmethod
+    def Log(seq_length, num_batches, batch_size, batches):
+        Util.Tee("config_log.txt", f"Dataset contains {num_batches} batches of {batch_size} sequences of {seq_length} tokens each ({Util.RoundNumber(seq_length * batch_size * num_batches)} tokens total)")
+        Util.Tee("config_log.txt", f"Model's context window is {seq_length * batch_size} (seq_length * batch_size)")
+        Util.Tee("config_log.txt", f"Batches shape is {torch.Size(batches.shape)}")
+
+
+    @staticmethod
+    def ConcatSplits(texts):
+        text = ''.join(texts)
+        return text
+
+
+    @staticmethod
+    def TokenDtype(vocab_size):
+        return np.uint16 if vocab_size <= (1 << 16) else np.uint32
+
+
+    @staticmethod
+    def CheckEodToken(eod_token, vocab_size):
+        # 0 is the id of unknown characters, and ids past the vocabulary are clipped to its last token
+        if eod_token is not None and not 0 < eod_token < vocab_size:
+            raise ValueError(f"eod_token {eod_token} is out of range, Expected 0 < eod_token < {vocab_size} (vocab_size).")
+
+
+    @staticmethod
+    def EncodingMode(num_workers=None, eod_token=None):
+        """ texts are encoded one by one ("documents") or as one concatenated stream, which gives different tokens """
+        return "documents" if (num_workers is not None and num_workers > 1) or eod_token is not None else "stream"
+
+
+    @staticmethod
+    def EncodeTexts(texts, tokenizer, vocab_size, num_workers=None, eod_token=None):
+        GenerateData.CheckEodToken(eod_token, vocab_size)
+
+        dtype = GenerateData.TokenDtype(vocab_size)
+
+        # Streaming over the texts encodes them as if concatenated, without building the joined string.
+        # Worker processes, or an end-of-document token between texts, encode each text on its own
+        if num_workers is not None and num_workers > 1:
+            input_ids, offsets = tokenizer.encode_batch(texts, num_workers=num_workers, flat=True)
+
+            if eod_token is not None:
+                input_ids = np.insert(input_ids, offsets[1:], eod_token)
+
+            return input_ids.astype(dtype, copy=False)
+
+        if eod_token is not None:
+            return np.fromiter(GenerateData.SeparateDocuments(texts, tokenizer, eod_token), dtype=dtype)
+
+        return np.fromiter(tokenizer.encode_stream(texts), dtype=dtype)
+
+
+    @staticmethod
+    def SeparateDocuments(texts, tokenizer, eod_token):
+        for text in texts:
+            yield from tokenizer.encode_stream(text)
+            yield eod_token
+
+
+    @staticmethod
+    def ClipOutOfVocab(input_ids, vocab_size):
+        if not isinstance(input_ids, np.ndarray):
+            input_ids = np.asarray(input_ids, dtype=GenerateData.TokenDtype(vocab_size))
+
+        clipped = np.minimum(input_ids, vocab_size - 1, out=input_ids if input_ids.flags.writeable else None)
+        return clipped
+
+
+    @staticmethod
+    def BatchSequences(input_ids, seq_length, batch_size, prefetch=2, pin_memory=False, shuffle=False, seed=0, eod_token=None, stream=False):
+        if stream is True and (shuffle is True or eod_token is not None):
+            raise ValueError("The stream layout keeps the token order, it can not be shuffled or split on documents.")
+
+        if stream is True:
+            batches = StreamLoader(input_ids, seq_length, batch_size, prefetch=prefetch, pin_memory=pin_memory)
+        elif shuffle is True or eod_token is not None:
+            batches = SequenceSampler(input_ids, seq_length, batch_size, seed=seed, shuffle=shuffle, eod_token=eod_token, prefetch=prefetch, pin_memory=pin_memory)
+        else:
+            batches = BatchLoader(input_ids, seq_length, batch_size, prefetch=prefetch, pin_memory=pin_memory)
+
+        return batches, batches.num_batches
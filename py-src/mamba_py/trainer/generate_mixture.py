@@ -0,0 +1,40 @@
+import os
+import numpy as np
+
+from mamba_py.utils.metaclasses      import CallableMeta
+from mamba_py.utils.util             import Util
+from mamba_py.trainer.mixture_loader import MixtureLoader
+
+
+class GenerateMixture(metaclass=CallableMeta):
+    @staticmethod
+    def __call__(sources, weights, seq_length, batch_size, num_batches=None, seed=0, shuffle=False, prefetch=2, pin_memory=False, dtype=np.uint16):
+        names   = [source if isinstance(source, str) else str(i) for i, source in enumerate(sources)]
+        sources = [GenerateMixture.LoadSource(source, dtype) for source in sources]
+
+        batches = MixtureLoader(sources, weights, seq_length, batch_size, num_batches=num_batches, seed=seed, shuffle=shuffle, names=names, prefetch=prefetch, pin_memory=pin_memory)
+        GenerateMixture.Log(seq_length, batch_size, batches, sources)
+
+        return batches, batches.num_batches
+
+
+    @staticmethod
+    def LoadSource(source, dtype=np.uint16):
+        if not isinstance(source, str):
+            return source
+
+        # .npy files, e.g. from the token cache, carry their dtype; anything else is raw tokens
+        if os.path.splitext(source)[1] == '.npy':
+            return np.load(source, mmap_mode='r')
+
+        return np.memmap(source, dtype=dtype, mode='r')
+
+
+    @staticmethod
+    def Log(seq_length, batch_size, batches, sources):
+        planned = batches.TokenCounts(batches.num_batches)
+
+        for (name, tokens), source, weight in zip(planned.items(), sources, batches.weights):
+            Util.Tee("config_log.txt", f"Source {name} has {Util.RoundNumber(len(source))} tokens, weight {weight:.3f}, {Util.RoundNumber(tokens)} tokens sampled per pass")
+
+        Util.Tee("config_log.txt", f"Mixture contains {batches.num_batches} batches of {batch_size} sequences of {seq_length} tokens each ({Util.RoundNumber(seq_length * batch_size * batches.num_batches)} tokens total)")
@@ -0,0 +1,316 @@
+import torch
+import inspect
+
+from types import MethodType
+
+from mamba_py.utils.metaclasses        import CallableMeta
+from mamba_py.utils.util               import Util
+from mamba_py.trainer.chunked_loss     import chunked_cross_entropy
+from mamba_py.trainer.generation_state import GenerationState
+
+
+class GenerateModel(metaclass=CallableMeta):
+    # Rows of [batch * seq_length] projected to logits at once by the chunked loss
+    loss_chunk_size = 1024
+
+
+    @staticmethod
+    def __call__(params, model_class, config_class):
+        config = config_class(**params)
+        model = model_class(config).to(Util.GetDevice())
+
+        model.compute_loss = MethodType(GenerateModel.AutoRegressiveLossFunction, model)
+        model.generate_text = MethodType(GenerateModel.GenerateText, model)
+        model.stream_text = MethodType(GenerateModel.StreamText, model)
+        model.generate_batch = MethodType(GenerateModel.GenerateBatch, model)
+        model.prefill = MethodType(GenerateModel.Prefill, model)
+        model.step = MethodType(GenerateModel.Step, model)
+        model.save = MethodType(GenerateModel.SaveToPytorch, model)
+
+        GenerateModel.Log(model)
+
+        return model, config
+
+
+    @staticmethod
+    def Log(model):
+        model_size, rounded_model_size = Util.GetNumParams(model)
+        Util.Tee("config_log.txt", f"Model has {model_size} ({rounded_model_size}) parameters")
+
+
+    @staticmethod
+    def AutoRegressiveLossFunction(self, input_ids, labels=None, criterion=None, chunk_size=None, states=None, return_states=False):
+        model = self
+        labels = (labels if labels is not None else input_ids).to(input_ids.device)
+        labels = labels[:, 1:].contiguous()
+
+        if states is not None or return_states is True:
+            # Recurrent models only (MambaLM). The last token is only a label, so the returned states end where the next chunk of a stream starts
+            hidden_states, states = model.backbone(input_ids[:, :-1], states, return_states=True)
+            hidden_states = hidden_states.reshape(-1, hidden_states.size(-1))
+
+            loss = chunked_cross_entropy(hidden_states, model.lm_head.weight, labels.view(-1), chunk_size or GenerateModel.loss_chunk_size)
+            return (loss, states) if return_states is True else loss
+
+        if criterion is None and GenerateModel.HasChunkedHead(model):
+            # Project only the hidden states to logits, chunk by chunk, so the [batch, seq_length, vocab_size] logits never exist
+            hidden_states = model.backbone(input_ids)[:, :-1, :]
+            hidden_states = hidden_states.reshape(-1, hidden_states.size(-1))
+
+            return chunked_cross_entropy(hidden_states, model.lm_head.weight, labels.view(-1), chunk_size or GenerateModel.loss_chunk_size)
+
+        lm_logits = model(input_ids).logits
+        shift_logits = lm_logits[:, :-1, :].contiguous()
+        loss_fct = criterion or torch.nn.CrossEntropyLoss()
+        lm_loss = loss_fct(shift_logits.view(-1, shift_logits.size(-1)), labels.view(-1))
+        return lm_loss
+
+    @staticmethod
+    def HasChunkedHead(model):
+        """ whether the model is a backbone followed by a bias-free lm_head, as MambaLMHeadModel """
+        backbone = getattr(model, "backbone", None)
+        lm_head = getattr(model, "lm_head", None)
+
+        return backbone is not None and isinstance(lm_head, torch.nn.Linear) and lm_head.bias is None
+
+
+    @staticmethod
+    def GenerateText(self, tokenizer, seed_text, num_predict, **sampling):
+        model = self
+        encoded_ids = tokenizer.encode(seed_text)
+
+        # Greedy by default, as model.generate was
+        sampling.setdefault("temperature", 0.0)
+        text = ''.join(GenerateModel.StreamText(model, tokenizer, encoded_ids, max_tokens=num_predict, **sampling))
+
+        return tokenizer.decode(encoded_ids) + text
+
+
+    @staticmethod
+    def StreamText(self, tokenizer, seed_text, max_tokens=256, stop=None, temperature=1.0, top_k=0, top_p=1.0, state=None, generator=None):
+        """
+        Yields the text of every generated token as soon as it is sampled, until max_tokens tokens or
+        one of the stop strings (which is not yielded). seed_text may also be a list of token ids.
+
+        To continue a generation afterwards, create its state with state = model.prefill(ids) and
+        pass it in: every call goes on from it, seed_text (which may be empty) being appended.
+        model.step(state, input_ids) feeds tokens to a state without generating.
+        """
+        model = self
+        stops = GenerateModel.StopStrings(stop)
+
+        prompt_ids = tokenizer.encode(seed_text) if isinstance(seed_text, str) else list(seed_text)
+
+        if len(prompt_ids) == 0 and (state is None or state.logits is None):
+            raise ValueError("Expected a seed_text of at least one token, or the state of a previous generation.")
+
+        state = GenerateModel.Prefill(model, prompt_ids, state)
+
+        pending = ""
+
+        for _ in range(max_tokens):
+            # The model's vocabulary may be padded past the tokenizer's
+            next_id = GenerateModel.SampleToken(state.logits[:, :len(tokenizer.vocab)], temperature, top_k, top_p, generator)
+            GenerateModel.Step(model, state, next_id)
+
+            text, pending, stopped = GenerateModel.StopText(pending + tokenizer.decode(next_id[0].tolist()), stops)
+
+            if text:
+                yield text
+
+            if stopped is True:
+                return
+
+        if pending:
+            yield pending
+
+
+    @staticmethod
+    def GenerateBatch(self, tokenizer, prompts, max_tokens=256, stop=None, temperature=0.0, top_k=0, top_p=1.0, batch_size=64, generator=None):
+        """
+        Generated text of every prompt (without the prompt), batch_size prompts at a time. The prompts
+        are fed together and decoded in lockstep, each with its own recurrent state in the batch,
+        and the sequences that are done leave the batch. Greedy by default, as GenerateText.
+        """
+        model = self
+        stops = GenerateModel.StopStrings(stop)
+
+        prompt_ids = [tokenizer.encode(prompt) if isinstance(prompt, str) else list(prompt) for prompt in prompts]
+        texts = [""] * len(prompt_ids)
+
+        if any(len(ids) == 0 for ids in prompt_ids):
+            raise ValueError("Expected every prompt to have at least one token.")
+
+        for start in range(0, len(prompt_ids) if max_tokens > 0 else 0, batch_size):
+            group = prompt_ids[start:start + batch_size]
+            sampling = (temperature, top_k, top_p, generator)
+
+            for i, text in enumerate(GenerateModel.GenerateGroup(model, tokenizer, group, max_tokens, stops, sampling)):
+                texts[start + i] = text
+
+        return texts
+
+
+    @staticmethod
+    def GenerateGroup(model, tokenizer, group, max_tokens, stops, sampling):
+        device = next(model.parameters()).device
+        lengths = [len(ids) for ids in group]
+
+        # The tokens all prompts have are fed at once, the rest of the longer prompts are fed during decoding
+        common = min(lengths)
+        state = GenerateModel.Prefill(model, [ids[:common] for ids in group])
+
+        texts     = [""] * len(group)
+        pending   = [""] * len(group)
+        positions = [common] * len(group)
+        generated = [0] * len(group)
+        active    = list(range(len(group)))
+
+        while active:
+            sampled = GenerateModel.SampleToken(state.logits[:, :len(tokenizer.vocab)], *sampling)[:, 0].tolist()
+
+            next_ids = []
+            keep = []
+
+            for row, i in enumerate(active):
+                if positions[i] < lengths[i]:
+                    next_ids.append(group[i][positions[i]])
+                    positions[i] += 1
+                    keep.append(row)
+                    continue
+
+                token = sampled[row]
+                generated[i] += 1
+
+                text, pending[i], stopped = GenerateModel.StopText(pending[i] + tokenizer.decode([token]), stops)
+                texts[i] += text
+
+                if stopped is True:
+                    continue
+
+                if generated[i] >= max_tokens:
+                    texts[i] += pending[i]
+                    continue
+
+                next_ids.append(token)
+                keep.append(row)
+
+            if not keep:
+                break
+
+            # Finished sequences leave the batch, with their state
+            if len(keep) < len(active):
+                state.Select(torch.tensor(keep, device=device))
+                active = [active[row] for row in keep]
+
+            GenerateModel.Step(model, state, torch.tensor(next_ids, dtype=torch.long, device=device).unsqueeze(1))
+
+        return texts
+
+
+    @staticmethod
+    def StopStrings(stop):
+        return [stop for stop in ([stop] if isinstance(stop, str) else stop or []) if stop]
+
+
+    @staticmethod
+    def StopText(pending, stops):
+        """ splits pending text in the text that can be given out and the text held back, and whether a stop string was reached """
+        found = [pending.find(stop) for stop in stops if stop in pending]
+
+        if found:
+            return pending[:min(found)], "", True
+
+        # Text that may be the start of a stop string is held back until it is known not to be
+        held = max([GenerateModel.StopPrefixLength(pending, stop) for stop in stops], default=0)
+        return pending[:len(pending) - held], pending[len(pending) - held:], False
+
+
+    @staticmethod
+    def StopPrefixLength(text, stop):
+        """ length of the longest end of text that starts stop """
+        for length in range(min(len(text), len(stop) - 1), 0, -1):
+            if stop.startswith(text[-length:]):
+                return length
+
+        return 0
+
+
+    @staticmethod
+    def TakesStates(model):
+        return "states" in inspect.signature(model.forward).parameters
+
+
+    @staticmethod
+    @torch.no_grad()
+    def Prefill(model, prompt_ids, state=None):
+        """ feeds prompt_ids (a list of ids, or equal length lists for a batch) to state, or to a new GenerationState it returns """
+        batched = len(prompt_ids) > 0 and isinstance(prompt_ids[0], (list, tuple))
+        input_ids = torch.tensor(prompt_ids if batched else [prompt_ids], dtype=torch.long, device=next(model.parameters()).device)
+
+        if state is None:
+            if GenerateModel.TakesStates(model):
+                state = GenerationState()
+            else:
+                from mamba_ssm.utils.generation import InferenceParams
+                state = GenerationState(inference_params=InferenceParams(max_seqlen=1 << 30, max_batch_size=input_ids.size(0)))
+
+        if input_ids.size(1) > 0:
+            GenerateModel.Step(model, state, input_ids)
+
+        return state
+
+
+    @staticmethod
+    @torch.no_grad()
+    def Step(model, state, input_ids):
+        """ feeds input_ids [batch, length] after the tokens already in state, and keeps the logits of the next token """
+        # mamba_ssm only runs a whole sequence on an empty cache, after that it steps one token at a time
+        if state.inference_params is not None and state.num_tokens > 0 and input_ids.size(1) > 1:
+            for i in range(input_ids.size(1)):
+                GenerateModel.Step(model, state, input_ids[:, i:i + 1])
+
+            return state
+
+        if state.inference_params is None:
+            output = model(input_ids, states=state.layers, return_states=True)
+            state.layers = output.states
+        else:
+            state.inference_params.seqlen_offset = state.num_tokens
+            output = model(input_ids, inference_params=state.inference_params)
+
+        state.logits = output.logits[:, -1]
+        state.num_tokens += input_ids.size(1)
+
+        return state
+
+
+    @staticmethod
+    def SampleToken(logits, temperature=1.0, top_k=0, top_p=1.0, generator=None):
+        """ next token ids [batch, 1], greedy when temperature is 0 """
+        logits = logits.float()
+
+        if temperature <= 0:
+            return logits.argmax(dim=-1, keepdim=True)
+
+        logits = logits / temperature
+
+        if top_k > 0:
+            threshold = torch.topk(logits, min(top_k, logits.size(-1))).values[:, -1:]
+            logits = logits.masked_fill(logits < threshold, float("-inf"))
+
+        if top_p < 1.0:
+            sorted_logits, sorted_ids = torch.sort(logits, descending=True)
+            cumulative = torch.softmax(sorted_logits, dim=-1).cumsum(dim=-1)
+
+            # Drop the tokens past top_p, always keeping the most likely one
+            remove = cumulative - torch.softmax(sorted_logits, dim=-1) >= top_p
+            logits = logits.masked_fill(remove.scatter(-1, sorted_ids, remove), float("-inf"))
+
+        return torch.multinomial(torch.softmax(logits, dim=-1), 1, generator=generator)
+
+
+    @staticmethod
+    def SaveToPytorch(self):
+        model = self
+        model.save_pretrained('./')
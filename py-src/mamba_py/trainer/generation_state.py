@@ -0,0 +1,29 @@
+class GenerationState:
+    """
+    Recurrent state of a generation, the same size whatever the number of tokens generated.
+
+    layers holds the (conv_state, ssm_state) of every layer for models taking states (MambaLM),
+    inference_params holds the same states for mamba_ssm models. logits are those of the next
+    token, and num_tokens counts the tokens consumed so far, prompt included.
+    """
+
+    def __init__(self, layers=None, inference_params=None):
+        self.layers           = layers
+        self.inference_params = inference_params
+        self.logits           = None
+        self.num_tokens       = 0
+
+
+    def Select(self, indices):
+        """ keeps the sequences at indices of the batch """
+        if self.layers is not None:
+            self.layers = [tuple(tensor[indices] for tensor in layer) for layer in self.layers]
+
+        if self.inference_params is not None:
+            memory = self.inference_params.key_value_memory_dict
+
+            for layer, states in memory.items():
+                memory[layer] = tuple(tensor[indices] for tensor in states)
+
+        if self.logits is not None:
+            self.logits = self.logits[indices]
@@ -0,0 +1,97 @@
+import numpy as np
+
+from mamba_py.trainer.batch_loader     import BatchLoader
+from mamba_py.trainer.sequence_sampler import SequenceSampler
+
+
+class MixtureLoader(BatchLoader):
+    """
+    Interleaves the batches of several token sources, picking the source of each batch with
+    probability proportional to its weight. The schedule of every epoch is drawn from (seed, epoch),
+    so any batch can be built on its own and the mixture prefetches and resumes like a BatchLoader.
+    Sources go on where the previous epoch left them, and a source that runs out of batches
+    starts over (with a new epoch when shuffled).
+    """
+
+    def __init__(self, sources, weights, seq_length, batch_size, num_batches=None, seed=0, shuffle=False, names=None, **kwargs):
+        if len(sources) != len(weights):
+            raise ValueError("Expected one weight per source.")
+
+        self.loaders = []
+        for i, source in enumerate(sources):
+            if shuffle is True:
+                loader = SequenceSampler(source, seq_length, batch_size, seed=seed + i, prefetch=0)
+            else:
+                loader = BatchLoader(source, seq_length, batch_size, prefetch=0)
+
+            if loader.num_batches == 0:
+                raise ValueError(f"Source {i} is too small for a single batch.")
+
+            self.loaders.append(loader)
+
+        super().__init__(np.zeros(0, dtype=np.uint16), seq_length, batch_size, **kwargs)
+
+        self.names       = names or [str(i) for i in range(len(sources))]
+        self.weights     = np.asarray(weights, dtype=np.float64) / np.sum(weights)
+        self.num_batches = num_batches if num_batches is not None else sum(len(loader) for loader in self.loaders)
+
+        self.seed = seed
+        self.SetEpoch(0)
+
+
+    def Schedule(self, epoch):
+        rng = np.random.default_rng([self.seed, epoch])
+        return rng.choice(len(self.loaders), size=self.num_batches, p=self.weights)
+
+
+    def SetEpoch(self, epoch):
+        """ draws the schedule of a mixture epoch, sources go on from the batches taken in the previous ones """
+        offsets = np.zeros(len(self.loaders), dtype=np.int64)
+        for previous in range(epoch):
+            offsets += np.bincount(self.Schedule(previous), minlength=len(self.loaders))
+
+        self.epoch    = epoch
+        self.schedule = self.Schedule(epoch)
+
+        # Index of each batch within its own source
+        self.positions = np.zeros(self.num_batches, dtype=np.int64)
+        for i in range(len(self.loaders)):
+            mask = self.schedule == i
+            self.positions[mask] = offsets[i] + np.arange(np.count_nonzero(mask))
+
+
+    def EndEpoch(self):
+        self.cursor = 0
+        self.SetEpoch(self.epoch + 1)
+
+
+    def Build(self, batch):
+        loader = self.loaders[self.schedule[batch]]
+        epoch, position = divmod(int(self.positions[batch]), len(loader))
+
+        if isinstance(loader, SequenceSampler) and loader.epoch != epoch:
+            loader.SetEpoch(epoch)
+
+        tensor = loader.Build(position)
+        if self.pin_memory is True:
+            tensor = tensor.pin_memory()
+
+        return tensor
+
+
+    def TokenCounts(self, num_batches=None):
+        """ tokens drawn from each source over the first num_batches batches, by default those consumed so far """
+        num_batches = self.cursor if num_batches is None else num_batches
+        counts = np.bincount(self.schedule[:num_batches], minlength=len(self.loaders))
+
+        return {name: int(count) * self.batch_size * self.seq_length for name, count in zip(self.names, counts)}
+
+
+    def state_dict(self):
+        return {"seed": self.seed, "epoch": self.epoch, "cursor": self.cursor}
+
+
+    def load_state_dict(self, state):
+        self.seed = state["seed"]
+        self.SetEpoch(state["epoch"])
+        super().load_state_dict(state)
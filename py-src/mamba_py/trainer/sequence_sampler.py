@@ -0,0 +1,123 @@
+import torch
+import numpy as np
+
+from mamba_py.trainer.batch_loader import BatchLoader
+
+
+class SequenceSampler(BatchLoader):
+    """
+    Batches of seq_length windows over a token stream, in a different order every epoch.
+
+    Windows start at a random offset each epoch, or at document starts when eod_token is set
+    (long documents are tiled, a window packs the documents that follow, and the next window
+    starts at the first document it did not reach, so no token is read twice). Packed windows
+    do not cover the whole stream: the tail of the document a window ends in, past that window
+    and short of a full tile, is never read. Windows are shuffled with a generator seeded by
+    (seed, epoch). Tokens are only read when a batch is built, and (epoch, cursor) is enough to
+    resume an epoch where it stopped.
+    """
+
+    def __init__(self, input_ids, seq_length, batch_size, seed=0, shuffle=True, random_offset=True, eod_token=None, drop_last=False, **kwargs):
+        super().__init__(input_ids, seq_length, batch_size, **kwargs)
+
+        self.seed          = seed
+        self.shuffle       = shuffle
+        self.random_offset = random_offset and eod_token is None
+        self.eod_token     = eod_token
+        self.drop_last     = drop_last
+
+        self.epoch         = 0
+        self.doc_starts    = self.DocumentStarts() if eod_token is not None else None
+        self.doc_windows   = self.PackDocuments() if eod_token is not None else None
+
+        num_windows = len(self.WindowStarts(offset=0))
+        if self.random_offset is True:
+            # A non-zero offset leaves room for one window less
+            num_windows = max(0, num_windows - 1)
+
+        self.num_windows = num_windows
+        self.num_batches = num_windows // batch_size if drop_last else -(-num_windows // batch_size)
+
+        self.SetEpoch(0)
+
+
+    def DocumentStarts(self):
+        ends = np.flatnonzero(self.input_ids == self.eod_token) + 1
+        starts = np.concatenate([[0], ends[ends < len(self.input_ids)]])
+        return starts.astype(np.int64)
+
+
+    def WindowStarts(self, offset):
+        num_tokens = len(self.input_ids)
+        seq_length = self.seq_length
+
+        if self.doc_starts is None:
+            return np.arange(offset, num_tokens - seq_length + 1, seq_length, dtype=np.int64)
+
+        return self.doc_windows
+
+
+    def PackDocuments(self):
+        """
+        Starts of windows that do not overlap, each at a document start or at the next tile of a long
+        document. Keeping windows on document starts drops the tokens of a document from the end of
+        the window that cut it to its next tile or its end, in every epoch.
+        """
+        num_tokens = len(self.input_ids)
+        seq_length = self.seq_length
+        doc_starts = self.doc_starts
+
+        starts = []
+        start = 0
+
+        while start + seq_length <= num_tokens:
+            starts.append(start)
+            end = start + seq_length
+
+            # A document the window ends in goes on with its next tile if it is long enough, else the next
+            # document starts and the rest of this one is dropped
+            doc = int(np.searchsorted(doc_starts, end, side="right")) - 1
+            tile = doc_starts[doc] + -(-(end - doc_starts[doc]) // seq_length) * seq_length
+            start = min(int(tile), int(doc_starts[doc + 1]) if doc + 1 < len(doc_starts) else num_tokens)
+
+        return np.asarray(starts, dtype=np.int64)
+
+
+    def SetEpoch(self, epoch):
+        rng = np.random.default_rng([self.seed, epoch])
+        offset = int(rng.integers(self.seq_length)) if self.random_offset is True else 0
+
+        starts = self.WindowStarts(offset)[:self.num_windows]
+        if self.shuffle is True:
+            starts = starts[rng.permutation(len(starts))]
+
+        self.epoch  = epoch
+        self.starts = starts
+
+
+    def EndEpoch(self):
+        self.cursor = 0
+        self.SetEpoch(self.epoch + 1)
+
+
+    def Build(self, batch):
+        starts = self.starts[batch * self.batch_size:(batch + 1) * self.batch_size]
+
+        indices = starts[:, None] + np.arange(self.seq_length)
+        array = np.asarray(self.input_ids[indices], dtype=np.int64)
+
+        tensor = torch.from_numpy(array)
+        if self.pin_memory is True:
+            tensor = tensor.pin_memory()
+
+        return tensor
+
+
+    def state_dict(self):
+        return {"seed": self.seed, "epoch": self.epoch, "cursor": self.cursor}
+
+
+    def load_state_dict(self, state):
+        self.seed = state["seed"]
+        self.SetEpoch(state["epoch"])
+        super().load_state_dict(state)
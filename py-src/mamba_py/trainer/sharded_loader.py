@@ -0,0 +1,40 @@
+import numpy as np
+
+from mamba_py.trainer.batch_loader import BatchLoader
+
+
+class ShardedLoader(BatchLoader):
+    """
+    The share of another loader's batches read by one rank of a data-parallel run: batch i of
+    the shard is batch i * world_size + rank of the loader. Every rank gets the same number of
+    batches, so the ranks stay in step, and the remainder is dropped.
+    """
+
+    def __init__(self, loader, rank, world_size):
+        super().__init__(np.zeros(0, dtype=np.uint16), loader.seq_length, loader.batch_size, device=loader.device, prefetch=loader.prefetch, pin_memory=loader.pin_memory)
+
+        self.loader      = loader
+        self.rank        = rank
+        self.world_size  = world_size
+        self.num_batches = loader.num_batches // world_size
+
+        # Batches are built here, the loader only has to build them
+        loader.prefetch = 0
+
+
+    def Build(self, batch):
+        return self.loader.Build(batch * self.world_size + self.rank)
+
+
+    def EndEpoch(self):
+        self.cursor = 0
+        self.loader.EndEpoch()
+
+
+    def state_dict(self):
+        return {"cursor": self.cursor, "loader": self.loader.state_dict()}
+
+
+    def load_state_dict(self, state):
+        self.loader.load_state_dict(state["loader"])
+        self.cursor = state["cursor"]
@@ -0,0 +1,50 @@
+import torch
+import numpy as np
+
+from mamba_py.trainer.batch_loader import BatchLoader
+
+
+class StreamLoader(BatchLoader):
+    """
+    Contiguous-stream layout for training with a recurrent state carried between batches.
+
+    The tokens are split in batch_size contiguous streams, one per row, and batch i holds the
+    i-th chunk of every stream. Consecutive chunks overlap by one token, the last token of a
+    chunk is only a label, so the state after a chunk continues right where the next one starts.
+    """
+
+    def __init__(self, input_ids, seq_length, batch_size, **kwargs):
+        super().__init__(input_ids, seq_length, batch_size, **kwargs)
+
+        if seq_length < 2:
+            raise ValueError("Expected seq_length >= 2, every chunk needs an input and a label.")
+
+        self.stream_length = len(self.input_ids) // batch_size
+        self.num_batches   = max(0, self.stream_length - 1) // (seq_length - 1)
+
+        self.rank          = 0
+        self.world_size    = 1
+
+
+    def Build(self, batch):
+        starts = np.arange(self.batch_size, dtype=np.int64) * self.stream_length + batch * (self.seq_length - 1)
+
+        indices = starts[:, None] + np.arange(self.seq_length)
+        array = np.asarray(self.input_ids[indices], dtype=np.int64)
+
+        tensor = torch.from_numpy(array)
+        if self.pin_memory is True:
+            tensor = tensor.pin_memory()
+
+        return tensor
+
+
+    def Shard(self, rank, world_size):
+        """ the loader over the rank-th of world_size equal parts of the tokens, so every rank keeps whole streams """
+        length = len(self.input_ids) // world_size
+        input_ids = self.input_ids[rank * length:(rank + 1) * length]
+
+        shard = StreamLoader(input_ids, self.seq_length, self.batch_size, device=self.device, prefetch=self.prefetch, pin_memory=self.pin_memory)
+        shard.rank, shard.world_size = rank, world_size
+
+        return shard
@@ -0,0 +1,56 @@
+import time
+
+from mamba_py.utils.time import Time
+from mamba_py.utils.util import Util
+
+
+class Throughput:
+    """
+    Statistics of every optimizer step: tokens per second, the time spent in each phase (as
+    recorded by the Time timers), memory usage and an ETA from an exponential moving average
+    of the step time, which is much steadier than the last step time alone.
+    """
+
+    phases = ("fetch", "forward", "backward", "allreduce", "optimizer")
+
+
+    def __init__(self, total_steps, smoothing=0.05):
+        self.total_steps = total_steps
+        self.smoothing   = smoothing
+        self.step_time   = None
+        self.num_tokens  = 0
+        self.time_last   = time.perf_counter()
+
+        Time.ResetTimers()
+
+
+    def AddTokens(self, num_tokens):
+        self.num_tokens += num_tokens
+
+
+    def Step(self, step):
+        time_current = time.perf_counter()
+        time_step = time_current - self.time_last
+        self.time_last = time_current
+
+        if self.step_time is None:
+            self.step_time = time_step
+        else:
+            self.step_time += self.smoothing * (time_step - self.step_time)
+
+        timers = Time.Timers()
+        remaining_steps = max(0, self.total_steps - step - 1)
+
+        stats = {
+            "tokens_per_sec": self.num_tokens / time_step if time_step > 0 else 0.0,
+            "step_time":      time_step,
+            "eta":            remaining_steps * self.step_time,
+        }
+
+        for phase in self.phases:
+            stats[f"time_{phase}"] = timers.get(phase, 0.0)
+
+        stats.update(Util.MemoryUsage())
+        self.num_tokens = 0
+
+        return stats
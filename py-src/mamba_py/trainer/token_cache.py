@@ -0,0 +1,97 @@
+import os
+import json
+import hashlib
+import numpy as np
+
+
+class TokenCache:
+    """
+    Stores encoded datasets as .npy files in cache_dir, keyed by a hash of everything that
+    changes the tokens. Files are memory-mapped on load, and the least recently used ones are
+    evicted once the cache grows over max_bytes.
+    """
+
+    def __init__(self, cache_dir, max_bytes=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+        os.makedirs(cache_dir, exist_ok=True)
+
+
+    @staticmethod
+    def Key(dataset_id, split, tokenizer, **settings):
+        identity = json.dumps({"dataset": str(dataset_id), "split": split, "settings": settings}, sort_keys=True)
+
+        digest = hashlib.sha256()
+        digest.update(identity.encode())
+        digest.update(tokenizer.vocab.records.tobytes())
+
+        return digest.hexdigest()[:32]
+
+
+    def Path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npy")
+
+
+    def Load(self, key):
+        path = self.Path(key)
+
+        if not os.path.exists(path):
+            return None
+
+        # Refresh the modification time, which orders eviction
+        os.utime(path)
+        return np.load(path, mmap_mode='r')
+
+
+    def Store(self, key, input_ids):
+        path = self.Path(key)
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+
+        with open(tmp_path, 'wb') as f:
+            np.save(f, input_ids)
+
+        os.replace(tmp_path, path)
+        self.Evict(keep=path)
+
+        return np.load(path, mmap_mode='r')
+
+
+    def Entries(self):
+        entries = []
+
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.npy'):
+                continue
+
+            path = os.path.join(self.cache_dir, name)
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        return sorted(entries)
+
+
+    def Evict(self, keep=None):
+        if self.max_bytes is None:
+            return
+
+        entries = self.Entries()
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+
+            if path == keep:
+                continue
+
+            os.remove(path)
+            total -= size
+
+
+    def Invalidate(self, key=None):
+        paths = [self.Path(key)] if key is not None else [path for _, _, path in self.Entries()]
+
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
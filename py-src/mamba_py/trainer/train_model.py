@@ -0,0 +1,225 @@
+import torch
+
+from mamba_py.utils.metaclasses     import CallableMeta
+from mamba_py.utils.metaclasses     import Globals
+from mamba_py.utils.util            import Util
+from mamba_py.utils.time            import Time
+from mamba_py.utils.wandb           import Wandb
+from mamba_py.utils.metrics         import Metrics
+from mamba_py.utils.distributed     import Distributed
+from mamba_py.trainer.validate_model import ValidateModel
+from mamba_py.trainer.checkpoint     import Checkpoint
+from mamba_py.trainer.throughput     import Throughput
+from mamba_py.trainer.sharded_loader import ShardedLoader
+from mamba_py.trainer.stream_loader  import StreamLoader
+from mamba_py.trainer.eval_worker    import EvalWorker
+
+
+class TrainModel(metaclass=CallableMeta):
+    train_step  = 0
+    metrics     = None
+    eval_worker = None
+
+
+    @staticmethod
+    def __call__(model, batches, num_epochs, learning_rate, val_batches=None, val_every=500, val_max_tokens=None, accumulation_steps=1, bf16=False, checkpoint_dir=None, checkpoint_every=1000, checkpoint_keep=3, resume=True, metrics=None, sync_timers=False, carry_state=False, eval_worker=None):
+        world_size    = Distributed.WorldSize()
+        is_main       = Distributed.IsMain()
+
+        # The state only carries over between rows that go on from one batch to the next
+        if carry_state is True and not TrainModel.IsStream(batches):
+            raise ValueError("carry_state=True expects batches from a StreamLoader, sharded with StreamLoader.Shard in a distributed run.")
+
+        # Every rank starts from the weights of rank 0, and reads its own share of the batches
+        if world_size > 1:
+            Distributed.BroadcastParameters(model)
+
+            # Streams have to stay whole on one rank for their state to carry over
+            if isinstance(batches, StreamLoader):
+                if batches.world_size == 1:
+                    batches = batches.Shard(Distributed.Rank(), world_size)
+            elif not isinstance(batches, ShardedLoader):
+                batches = ShardedLoader(batches, Distributed.Rank(), world_size)
+
+        optimizer     = torch.optim.Adam(model.parameters(), lr=learning_rate)
+        num_batches   = len(batches)
+        device_type   = Util.GetDevice().type
+        checkpoint    = Checkpoint(checkpoint_dir, checkpoint_keep) if checkpoint_dir is not None else None
+        start_epoch   = 0
+        num_steps     = -(-num_batches // accumulation_steps)
+
+        TrainModel.metrics = metrics or Metrics("metrics.jsonl", backends=[Wandb])
+
+        if checkpoint is not None and resume is True:
+            start_epoch = TrainModel.Resume(checkpoint, model, optimizer, batches)
+
+        # Waiting for the device makes the phase timings exact, at the cost of the overlap between them
+        Time.sync  = torch.cuda.synchronize if sync_timers is True and device_type == "cuda" else None
+        throughput = Throughput(num_steps * num_epochs)
+
+        # Generation during training runs in its own process, on a snapshot of the weights
+        if Globals.infer_during_training is True and eval_worker is None and is_main is True:
+            TrainModel.eval_worker = EvalWorker(model, Globals.tokenizer, Globals.seed_text, Globals.num_predict)
+        else:
+            TrainModel.eval_worker = eval_worker
+
+        model.train()
+        Wandb.Init()
+
+        for epoch in range(start_epoch, num_epochs):
+            step_loss   = 0
+            micro_steps = 0
+
+            # Streams start over from a zero state every epoch, and after a resume
+            states      = None
+
+            # A resumed epoch starts at the loader cursor, keep batch the index within the epoch
+            for batch, input_ids in enumerate(Time.Iter(batches, "fetch"), start=batches.cursor):
+                with torch.autocast(device_type=device_type, dtype=torch.bfloat16, enabled=bf16), Time.Timer("forward"):
+                    if carry_state is True:
+                        loss, states = model.compute_loss(input_ids, states=states, return_states=True)
+                    else:
+                        loss = model.compute_loss(input_ids)
+
+                # Truncated backpropagation through time, the state goes on but its gradient stops at the chunk boundary
+                if carry_state is True:
+                    states = TrainModel.DetachStates(states)
+
+                # Average the gradients over the micro-batches of one optimizer step
+                with Time.Timer("backward"):
+                    (loss / accumulation_steps).backward()
+
+                throughput.AddTokens(input_ids.numel() * world_size)
+
+                step_loss += loss.detach()
+                micro_steps += 1
+
+                if micro_steps < accumulation_steps and batch < num_batches - 1:
+                    continue
+
+                # The loss is averaged along with the gradients, so rank 0 logs the loss of the whole step
+                with Time.Timer("allreduce"):
+                    step_loss, = Distributed.AllReduceGradients(model, step_loss / micro_steps)
+
+                with Time.Timer("optimizer"):
+                    TrainModel.OptimizerStep(model, optimizer, micro_steps, accumulation_steps)
+
+                TrainModel.LogStep(model, epoch, num_epochs, batch, num_batches, step_loss, stats=throughput.Step(TrainModel.train_step))
+
+                step_loss   = 0
+                micro_steps = 0
+
+                if val_batches is not None and TrainModel.train_step % val_every == 0 and is_main is True:
+                    TrainModel.Validate(model, val_batches, val_max_tokens)
+
+                if checkpoint is not None and TrainModel.train_step % checkpoint_every == 0 and is_main is True:
+                    checkpoint.Save(TrainModel.train_step, model, optimizer, batches, epoch)
+
+        if checkpoint is not None:
+            if TrainModel.train_step % checkpoint_every != 0 and is_main is True:
+                checkpoint.Save(TrainModel.train_step, model, optimizer, batches, num_epochs)
+            checkpoint.Close()
+
+        if TrainModel.eval_worker is not None:
+            results = TrainModel.eval_worker.Close() if eval_worker is None else TrainModel.eval_worker.Poll()
+            TrainModel.LogInference(results)
+
+        if metrics is None:
+            TrainModel.metrics.Close()
+        else:
+            metrics.Wait()
+
+        Wandb.Finish()
+
+
+    @staticmethod
+    def Resume(checkpoint, model, optimizer, batches):
+        state = checkpoint.Load(map_location=Util.GetDevice())
+
+        if state is None:
+            return 0
+
+        TrainModel.train_step, epoch = checkpoint.Restore(state, model, optimizer, batches)
+        TrainModel.metrics.Print("training_log.txt", f"Resumed from {checkpoint.Latest()} at step {TrainModel.train_step}, epoch {epoch}")
+
+        return epoch
+
+
+    @staticmethod
+    def LogInference(results):
+        for step, text, seconds, error in results:
+            if error is not None:
+                TrainModel.metrics.Print("inference_log.txt", f"Step: {step}\t\tGeneration failed: {error}\n")
+                continue
+
+            TrainModel.metrics.Log({"step": step, "inference_seconds": seconds})
+            TrainModel.metrics.Print("inference_log.txt", f"Step: {step}\n{text}\n")
+
+
+    @staticmethod
+    def IsStream(batches):
+        # A ShardedLoader over more than one rank interleaves the chunks of every stream across the ranks
+        if isinstance(batches, ShardedLoader):
+            if batches.world_size > 1:
+                return False
+
+            batches = batches.loader
+
+        return isinstance(batches, StreamLoader)
+
+
+    @staticmethod
+    def DetachStates(states):
+        return [tuple(tensor.detach() for tensor in state) for state in states]
+
+
+    @staticmethod
+    def OptimizerStep(model, optimizer, micro_steps, accumulation_steps):
+        # The last step of an epoch may have fewer micro-batches, rescale to keep their mean
+        if micro_steps != accumulation_steps:
+            for param in model.parameters():
+                if param.grad is not None:
+                    param.grad.mul_(accumulation_steps / micro_steps)
+
+        optimizer.step()
+        optimizer.zero_grad()
+
+
+    @staticmethod
+    def Validate(model, val_batches, val_max_tokens=None):
+        loss, perplexity = ValidateModel(model, val_batches, val_max_tokens)
+
+        if loss is not None:
+            ValidateModel.Log(TrainModel.train_step, loss, perplexity, TrainModel.metrics)
+
+
+    @staticmethod
+    def ComputeTime(stats):
+        time_up     = Time.Up(raw=True)
+        time_remain = stats["eta"]
+
+        return Time.FormatString(time_up), Time.FormatString(time_up + time_remain), Time.FormatString(time_remain)
+
+
+    @staticmethod
+    def LogStep(model, epoch, num_epochs, batch, num_batches, loss, log_every=10, stats=None):
+        step = TrainModel.train_step
+
+        # The loss stays a tensor, it is only read by the metrics writer thread
+        values = {"step": step, "epoch": epoch, "batch": batch, "loss": loss, **(stats or {})}
+
+        if step % log_every == 0 and stats is not None:
+            time_up, time_total, time_remain = TrainModel.ComputeTime(stats)
+            TrainModel.metrics.Log(values, "training_log.txt", f"Step: {step}\t\tEpoch: {epoch} / {num_epochs}\t\tBatch: {batch} / {num_batches}\t\tLoss: {{loss:.4f}}\t\tTokens/s: {{tokens_per_sec:.0f}}\t\tTime: {time_up} / {time_total}\t({time_remain} remaining)")
+        elif step % log_every == 0:
+            TrainModel.metrics.Log(values, "training_log.txt", f"Step: {step}\t\tEpoch: {epoch} / {num_epochs}\t\tBatch: {batch} / {num_batches}\t\tLoss: {{loss:.4f}}")
+        else:
+            TrainModel.metrics.Log(values)
+
+        if TrainModel.eval_worker is not None:
+            TrainModel.LogInference(TrainModel.eval_worker.Poll())
+
+            if Globals.infer_during_training is True and step % (log_every * 10) == 0:
+                TrainModel.eval_worker.Publish(model, step)
+
+        TrainModel.train_step += 1
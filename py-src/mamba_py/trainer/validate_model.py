@@ -0,0 +1,54 @@
+import math
+import torch
+
+from mamba_py.utils.metaclasses import CallableMeta
+from mamba_py.utils.util        import Util
+from mamba_py.utils.wandb       import Wandb
+
+
+class ValidateModel(metaclass=CallableMeta):
+    @staticmethod
+    def __call__(model, batches, max_tokens=None):
+        was_training = model.training
+        model.eval()
+
+        total_loss   = 0.0
+        total_tokens = 0
+
+        # Always start from the first batch, so every evaluation sees the same tokens
+        batches.cursor = 0
+
+        with torch.no_grad():
+            for input_ids in batches:
+                num_tokens = input_ids.size(0) * (input_ids.size(1) - 1)
+
+                loss = model.compute_loss(input_ids)
+                total_loss += loss.item() * num_tokens
+                total_tokens += num_tokens
+
+                if max_tokens is not None and total_tokens >= max_tokens:
+                    break
+
+        batches.cursor = 0
+
+        if was_training is True:
+            model.train()
+
+        if total_tokens == 0:
+            return None, None
+
+        loss = total_loss / total_tokens
+        return loss, math.exp(min(loss, 100))
+
+
+    @staticmethod
+    def Log(step, loss, perplexity, metrics=None):
+        wandb_args = {"step": step, "val_loss": loss, "val_perplexity": perplexity}
+
+        if metrics is not None:
+            metrics.Log(wandb_args, "training_log.txt", f"Step: {step}\t\tValidation loss: {round(loss, 4)}\t\tPerplexity: {round(perplexity, 2)}")
+            return
+
+        Wandb.Log(wandb_args)
+
+        Util.Tee("training_log.txt", f"Step: {step}\t\tValidation loss: {round(loss, 4)}\t\tPerplexity: {round(perplexity, 2)}")
@@ -0,0 +1,123 @@
+import os
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+
+from mamba_py.utils.util import Util
+
+
+class Distributed:
+    """
+    Data-parallel training over torch.distributed. Processes are started by torchrun, which sets
+    RANK and WORLD_SIZE, or by Distributed.Spawn. Without either, everything runs as a single rank.
+    """
+
+    @staticmethod
+    def Init(backend="gloo", num_threads=None):
+        if dist.is_available() is False or dist.is_initialized() is True:
+            return
+
+        world_size = int(os.environ.get("WORLD_SIZE", 1))
+        if world_size <= 1:
+            return
+
+        dist.init_process_group(backend, init_method="env://")
+
+        # Split the cores between the ranks of this machine, unless told otherwise
+        local_world_size = int(os.environ.get("LOCAL_WORLD_SIZE", world_size))
+        torch.set_num_threads(num_threads or max(1, (os.cpu_count() or 1) // local_world_size))
+
+
+    @staticmethod
+    def Destroy():
+        if dist.is_available() is True and dist.is_initialized() is True:
+            dist.destroy_process_group()
+
+
+    @staticmethod
+    def Rank():
+        return dist.get_rank() if Distributed.IsInitialized() else 0
+
+    @staticmethod
+    def WorldSize():
+        return dist.get_world_size() if Distributed.IsInitialized() else 1
+
+    @staticmethod
+    def IsInitialized():
+        return dist.is_available() and dist.is_initialized()
+
+    @staticmethod
+    def IsMain():
+        return Util.IsMainProcess()
+
+
+    @staticmethod
+    def Barrier():
+        if Distributed.WorldSize() > 1:
+            dist.barrier()
+
+
+    @staticmethod
+    def BroadcastParameters(model):
+        """ copies the parameters and buffers of rank 0 to every rank """
+        if Distributed.WorldSize() == 1:
+            return
+
+        with torch.no_grad():
+            for tensor in list(model.parameters()) + list(model.buffers()):
+                dist.broadcast(tensor, src=0)
+
+
+    @staticmethod
+    def AllReduceGradients(model, *tensors):
+        """ averages the gradients, and the given tensors, over every rank in a single all-reduce """
+        world_size = Distributed.WorldSize()
+
+        if world_size == 1:
+            return tensors
+
+        # A missing gradient counts as zeros, so every rank lays out the same flat buffer
+        params = [param for param in model.parameters() if param.requires_grad]
+        grads = [param.grad if param.grad is not None else torch.zeros_like(param) for param in params]
+        parts = [grad.reshape(-1) for grad in grads] + [tensor.detach().reshape(-1).to(grads[0]) for tensor in tensors]
+
+        flat = torch.cat(parts)
+        dist.all_reduce(flat, op=dist.ReduceOp.SUM)
+        flat.div_(world_size)
+
+        offset = 0
+        for param, grad in zip(params, grads):
+            grad.copy_(flat[offset:offset + grad.numel()].view_as(grad))
+            param.grad = grad
+            offset += grad.numel()
+
+        reduced = []
+        for tensor in tensors:
+            reduced.append(flat[offset:offset + tensor.numel()].view_as(tensor).to(tensor.dtype))
+            offset += tensor.numel()
+
+        return tuple(reduced)
+
+
+    @staticmethod
+    def Spawn(fn, num_processes, *args, backend="gloo", port=29500):
+        """ runs fn(*args) in num_processes ranks on this machine """
+        os.environ.setdefault("MASTER_ADDR", "127.0.0.1")
+        os.environ["MASTER_PORT"] = str(port)
+
+        mp.spawn(Distributed.Worker, args=(fn, num_processes, backend, args), nprocs=num_processes, join=True)
+
+
+    @staticmethod
+    def Worker(rank, fn, num_processes, backend, args):
+        os.environ["RANK"]             = str(rank)
+        os.environ["LOCAL_RANK"]       = str(rank)
+        os.environ["WORLD_SIZE"]       = str(num_processes)
+        os.environ["LOCAL_WORLD_SIZE"] = str(num_processes)
+
+        Distributed.Init(backend)
+
+        try:
+            fn(*args)
+        finally:
+            Distributed.Destroy()
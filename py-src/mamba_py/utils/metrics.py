@@ -0,0 +1,165 @@
+import csv
+import json
+import time
+import queue
+import threading
+import torch
+
+from mamba_py.utils.util import Util
+
+
+class Metrics:
+    """
+    Buffers logged scalars and hands them to a background thread, which writes them to a local
+    JSONL or CSV file, the text logs and every backend (any object with a Log(dict) method, as Wandb).
+
+    Tensors are kept as they are until the writer converts them, so logging a loss does not wait
+    for the device. The buffer is flushed every flush_every records or flush_interval seconds.
+    """
+
+    def __init__(self, path=None, format="jsonl", backends=(), flush_every=100, flush_interval=10.0, enabled=None):
+        if format not in ("jsonl", "csv"):
+            raise ValueError(f"Unknown metrics format '{format}', Expected 'jsonl' or 'csv'.")
+
+        self.path           = path
+        self.format         = format
+        self.backends       = list(backends)
+        self.flush_every    = flush_every
+        self.flush_interval = flush_interval
+
+        # In a distributed run only rank 0 logs by default
+        self.enabled = Util.IsMainProcess() if enabled is None else enabled
+
+        self.buffer     = []
+        self.last_flush = time.time()
+        self.error      = None
+
+        self.queue  = queue.Queue()
+        self.thread = threading.Thread(target=self.WriteLoop, daemon=True)
+        self.thread.start()
+
+
+    def Log(self, values, file=None, text=None):
+        """ queues values, and a text line formatted with them (e.g. "Loss: {loss:.4f}") for file """
+        if self.enabled is False:
+            return
+
+        values = {key: value.detach() if isinstance(value, torch.Tensor) else value for key, value in values.items()}
+        self.buffer.append((values, file, text))
+
+        if len(self.buffer) >= self.flush_every or time.time() - self.last_flush >= self.flush_interval:
+            self.Flush()
+
+    def Print(self, file, text):
+        if self.enabled is False:
+            return
+
+        self.buffer.append((None, file, text))
+        self.Flush()
+
+
+    def Flush(self):
+        self.RaiseError()
+
+        if self.buffer:
+            self.queue.put(self.buffer)
+
+        self.buffer     = []
+        self.last_flush = time.time()
+
+    def Wait(self):
+        self.Flush()
+        self.queue.join()
+        self.RaiseError()
+
+    def Close(self):
+        self.Flush()
+
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+
+        self.RaiseError()
+
+
+    def RaiseError(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise RuntimeError("Writing metrics failed") from error
+
+
+    @staticmethod
+    def ToPython(values):
+        return {key: value.item() if isinstance(value, torch.Tensor) else value for key, value in values.items()}
+
+
+    def WriteLoop(self):
+        files = {}
+
+        try:
+            while True:
+                entries = self.queue.get()
+
+                try:
+                    if entries is not None:
+                        self.Write(entries, files)
+                except Exception as error:
+                    self.error = error
+                finally:
+                    self.queue.task_done()
+
+                if entries is None:
+                    break
+        finally:
+            for f in files.values():
+                f.close()
+
+
+    def Open(self, files, file):
+        if file not in files:
+            files[file] = open(file, 'a', newline='')
+
+            if file == self.path and self.format == "csv" and files[file].tell() == 0:
+                csv.writer(files[file]).writerow(["step", "name", "value"])
+
+        return files[file]
+
+
+    def Write(self, entries, files):
+        written = set()
+
+        for values, file, text in entries:
+            if values is not None:
+                # The only place the device is waited on, outside of the training loop
+                values = Metrics.ToPython(values)
+
+                if self.path is not None:
+                    self.WriteValues(self.Open(files, self.path), values)
+                    written.add(self.path)
+
+                for backend in self.backends:
+                    backend.Log(values)
+
+            if file is not None:
+                line = text.format(**values) if values is not None else text
+                print(line)
+
+                self.Open(files, file).write(f"{line}\n")
+                written.add(file)
+
+        for file in written:
+            files[file].flush()
+
+
+    def WriteValues(self, f, values):
+        if self.format == "jsonl":
+            f.write(json.dumps(values) + "\n")
+            return
+
+        # Long format, so records with different names share the same columns
+        step = values.get("step", "")
+        writer = csv.writer(f)
+
+        for name, value in values.items():
+            if name != "step":
+                writer.writerow([step, name, value])
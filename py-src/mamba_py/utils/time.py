@@ -1,5 +1,6 @@
 import time
 
+from contextlib import contextmanager
 from mamba_py.utils.metaclasses import CallableMeta
 from mamba_py.utils.metaclasses import Globals
 from mamba_py.utils.util 		 import Util
@@ -10,6 +11,11 @@ class Time(metaclass=CallableMeta):
     time_init = None
     time_last = None
 
+    # Named timers, totals are keyed by the path of the running timers, e.g. "step/forward"
+    timers      = {}
+    timer_stack = []
+    sync        = None
+
 
     @staticmethod
     def __call__():
@@ -80,3 +86,70 @@ class Time(metaclass=CallableMeta):
         Time.time_last = time_current
 
         return time_step if raw is True else Time.FormatString(time_step)
+
+
+    @staticmethod
+    def Start(name):
+        if Time.sync is not None:
+            Time.sync()
+
+        path = f"{Time.timer_stack[-1][1]}/{name}" if Time.timer_stack else name
+        Time.timer_stack.append((name, path, time.perf_counter()))
+
+
+    @staticmethod
+    def Stop(name=None):
+        if Time.sync is not None:
+            Time.sync()
+
+        time_stop = time.perf_counter()
+        running, path, time_start = Time.timer_stack.pop()
+
+        if name is not None and name != running:
+            raise ValueError(f"Timer '{name}' stopped while timer '{running}' is running")
+
+        Time.timers[path] = Time.timers.get(path, 0.0) + time_stop - time_start
+        return time_stop - time_start
+
+
+    @staticmethod
+    @contextmanager
+    def Timer(name):
+        Time.Start(name)
+
+        try:
+            yield
+        finally:
+            Time.Stop(name)
+
+
+    @staticmethod
+    def Iter(iterable, name):
+        """ yields from iterable, timing every next() under name """
+        iterator = iter(iterable)
+        done = object()
+
+        while True:
+            with Time.Timer(name):
+                item = next(iterator, done)
+
+            if item is done:
+                return
+
+            yield item
+
+
+    @staticmethod
+    def Timers(reset=True):
+        timers = Time.timers
+
+        if reset is True:
+            Time.timers = {}
+
+        return timers
+
+
+    @staticmethod
+    def ResetTimers():
+        Time.timers = {}
+        Time.timer_stack = []
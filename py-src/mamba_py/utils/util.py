@@ -1,3 +1,5 @@
+import os
+import sys
 import torch
 import numpy as np
 
@@ -46,8 +48,41 @@ class Util:
         return size, rounded_size
 
 
+    @staticmethod
+    def MemoryUsage():
+        """ current and peak resident memory of the process, and allocator memory when on cuda, in MB """
+        import resource
+
+        usage = {}
+
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        usage["peak_rss_mb"] = peak_rss / (2**20 if sys.platform == "darwin" else 2**10)
+
+        if os.path.exists("/proc/self/statm"):
+            with open("/proc/self/statm") as f:
+                usage["rss_mb"] = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+        if torch.cuda.is_available():
+            usage["cuda_allocated_mb"] = torch.cuda.memory_allocated() / 2**20
+            usage["cuda_peak_mb"] = torch.cuda.max_memory_allocated() / 2**20
+
+        return usage
+
+
+    @staticmethod
+    def IsMainProcess():
+        """ whether this is rank 0, or the only process, of a torch.distributed run """
+        distributed = torch.distributed.is_available() and torch.distributed.is_initialized()
+        return distributed is False or torch.distributed.get_rank() == 0
+
+
     @staticmethod
     def Tee(file, str):
+        # Every rank runs the same code, only rank 0 logs
+        if Util.IsMainProcess() is False:
+            return
+
         print(str)
 
         with open(file, 'a') as f:
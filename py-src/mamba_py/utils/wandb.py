@@ -11,7 +11,7 @@ class Wandb(metaclass=CallableMeta):
 
     @staticmethod
     def Init():
-        if Globals.wandb_log_run is False:
+        if Globals.wandb_log_run is False or Util.IsMainProcess() is False:
             return
 
         if Wandb.wandb_has_init is True:
@@ -34,7 +34,7 @@ class Wandb(metaclass=CallableMeta):
 
     @staticmethod
     def Log(args):
-        if Globals.wandb_log_run is False:
+        if Globals.wandb_log_run is False or Util.IsMainProcess() is False:
             return
 
         if Wandb.wandb_has_init is False:
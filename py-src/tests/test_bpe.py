@@ -0,0 +1,87 @@
+"""
+Randomized comparison of the BPE trainers against the reference most_occurring_pair / replace_pair loop
+
+    python -m pytest tests
+"""
+
+import os
+import sys
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from mamba_py.tokenizer.bpe      import PairIndex, most_occurring_pair, replace_pair
+from mamba_py.tokenizer.parallel import ShardedPairIndex
+
+
+def reference_merges(arr, num_merges):
+    merges = []
+
+    for id in range(256, 256 + num_merges):
+        pair = most_occurring_pair(arr)
+        if pair is None:
+            break
+
+        merges.append(pair)
+        arr = replace_pair(arr, pair, id)
+
+    return merges, arr
+
+
+def index_merges(index, num_merges):
+    merges = []
+
+    for id in range(256, 256 + num_merges):
+        pair = index.most_occurring_pair()
+        if pair is None:
+            break
+
+        merges.append(pair)
+        index.replace_pair(pair, id)
+
+    return merges
+
+
+def random_text(rng, max_length=200):
+    # Small alphabets give long runs of the same symbol, where overlapping pairs are merged left to right
+    alphabet = rng.choice(["a", "ab", "abc", "abcdefgh"])
+    return ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, max_length)))
+
+
+def test_pair_index_matches_reference():
+    rng = random.Random(0)
+
+    for _ in range(200):
+        text = random_text(rng)
+        arr = [ord(c) for c in text]
+
+        merges, result = reference_merges(arr, 40)
+        index = PairIndex(arr)
+
+        assert index_merges(index, 40) == merges
+        assert index.to_list() == result
+
+
+def random_shards(rng, text):
+    # Cut points may repeat, which leaves empty shards
+    cuts = sorted(rng.randint(0, len(text)) for _ in range(rng.randint(0, 5)))
+    return [text[start:end] for start, end in zip([0] + cuts, cuts + [len(text)])]
+
+
+def test_sharded_pair_index_matches_reference():
+    rng = random.Random(0)
+
+    cases = [random_shards(rng, random_text(rng, 120)) for _ in range(40)]
+
+    # Runs of one symbol spanning shards, merged in pairs from the leftmost element
+    cases += [["a" * rng.randint(0, 6) for _ in range(rng.randint(1, 6))] for _ in range(20)]
+    cases += [["", "", "aaa"], ["aaa", "", "a", "aaaa"], ["ab", "a", "a", "ab"], [""], []]
+
+    for shards in cases:
+        merges, _ = reference_merges([ord(c) for c in ''.join(shards)], 30)
+        index = ShardedPairIndex(shards, rng.randint(1, 3))
+
+        try:
+            assert index_merges(index, 30) == merges, shards
+        finally:
+            index.close()